@@ -0,0 +1,121 @@
+# Compara latencias p50/p99 de las rutas en modo síncrono y en modo async
+# (DATABASE_ASYNC=true) con alta concurrencia, usando una base temporal.
+#
+#   python benchmarks/bench_async_db.py --requests 2000 --concurrency 100
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def drive(app, token: str, paths: list[str], concurrency: int) -> list[float]:
+    import httpx
+
+    latencies: list[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers=headers
+    ) as client:
+
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def child(args) -> None:
+    sys.path.insert(0, SRC)
+    from database import SessionLocal, create_db_and_tables
+    from dependencies import create_access_token
+    from main import app
+    from models.user import User
+    from utils import create_admin_user
+
+    create_db_and_tables()
+    db = SessionLocal()
+    create_admin_user(db)
+    db.add_all(
+        User(name=f"User {i}", email=f"user{i}@example.com", hashed_password="x")
+        for i in range(args.users)
+    )
+    db.commit()
+    db.close()
+
+    token = create_access_token({"sub": "admin@example.com", "role": "admin"})
+    paths = [
+        f"/users/{i % args.users + 1}" if i % 2 else "/users/?limit=20"
+        for i in range(args.requests)
+    ]
+    start = time.perf_counter()
+    latencies = asyncio.run(drive(app, token, paths, args.concurrency))
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "mode": "async" if os.getenv("DATABASE_ASYNC") == "true" else "sync",
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "rps": round(args.requests / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = []
+    for mode in ("false", "true"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_ASYNC=mode,
+                DATABASE_NAME=os.path.join(tmp, "bench.db"),
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", *sys.argv[1:]],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
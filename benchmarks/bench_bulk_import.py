@@ -0,0 +1,89 @@
+# Throughput (filas/segundo) de POST /users/bulk frente a POST /users/ fila por fila.
+#
+#   python benchmarks/bench_bulk_import.py --rows 5000 --bcrypt-rounds 4
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def make_records(prefix: str, count: int) -> list[dict]:
+    return [
+        {
+            "name": f"Bench {prefix} {i}",
+            "email": f"{prefix}{i}@example.com",
+            "password": "password123",
+            "cp": f"{i % 100000:05d}",
+            "phone": f"55{i % 100000000:08d}",
+        }
+        for i in range(count)
+    ]
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+    from dependencies import create_access_token
+
+    token = create_access_token({"sub": "admin@example.com", "role": "admin"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=None,
+    ) as client:
+        records = make_records("bulk", args.rows)
+        start = time.perf_counter()
+        response = await client.post("/users/bulk", json=records)
+        bulk_elapsed = time.perf_counter() - start
+        assert response.json()["created"] == args.rows, response.text
+
+        single = make_records("single", args.single_rows)
+        start = time.perf_counter()
+        for record in single:
+            response = await client.post("/users/", json=record)
+            assert response.status_code == 200, response.text
+        single_elapsed = time.perf_counter() - start
+
+    return {
+        "bcrypt_rounds": args.bcrypt_rounds,
+        "bulk_rows": args.rows,
+        "bulk_rows_per_sec": round(args.rows / bulk_elapsed, 2),
+        "single_rows": args.single_rows,
+        "single_rows_per_sec": round(args.single_rows / single_elapsed, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--single-rows", type=int, default=200)
+    # bcrypt domina el costo; bajar las rondas aísla el costo de validación e inserción
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_NAME"] = os.path.join(tmp.name, "bench.db")
+    sys.path.insert(0, SRC)
+
+    from hashing import pwd_context
+    from database import SessionLocal, create_db_and_tables
+    from utils import create_admin_user
+
+    pwd_context.update(bcrypt__rounds=args.bcrypt_rounds)
+    create_db_and_tables()
+    db = SessionLocal()
+    create_admin_user(db)
+    db.close()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
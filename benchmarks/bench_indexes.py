@@ -0,0 +1,94 @@
+# Costo de escritura y tamaño de archivo de la tabla user con los índices
+# anteriores a la auditoría ("before") y con los actuales ("after").
+#
+#   python benchmarks/bench_indexes.py --users 20000
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Índices que la migración 4 eliminó o reemplazó
+LEGACY_INDEXES = {
+    "ix_user_id": "id",
+    "ix_user_cp": "cp",
+    "ix_user_address": "address",
+}
+
+
+def make_user(i: int) -> dict:
+    return {
+        "name": f"Usuario {i:07d}",
+        "email": f"user{i}@example.com",
+        "rfc": f"ABCD{i:09d}",
+        "curp": f"CURP{i:014d}",
+        "cp": f"{i % 99999:05d}",
+        "phone": f"55{i:08d}",
+        "address": f"Calle {i % 500} número {i}, colonia Centro, Ciudad de México",
+        "date": f"{i % 28 + 1:02d}-{i % 12 + 1:02d}-{1950 + i % 60}",
+    }
+
+
+def run(schema: str, args, tmp: str) -> dict:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from database import Base
+    from crud import user as crud
+    from schemas.user import UserCreate, UserUpdate
+
+    path = os.path.join(tmp, f"{schema}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    if schema == "before":
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_user_cp_date"))
+            for name, column in LEGACY_INDEXES.items():
+                conn.execute(text(f'CREATE INDEX {name} ON "user" ({column})'))
+    Session = sessionmaker(bind=engine)
+
+    # Mismo camino que las rutas: una transacción por usuario
+    start = time.perf_counter()
+    for i in range(args.users):
+        with Session() as db:
+            crud.create_user(db, UserCreate(password="x", **make_user(i)), "hash")
+    insert_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.users):
+        data = make_user(i)
+        data.update(cp=f"{(i + 7) % 99999:05d}", address=f"Avenida {i}", date="01-01-2000")
+        with Session() as db:
+            crud.update_user(db, i + 1, UserUpdate(**data))
+    update_time = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        indexes = conn.scalar(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = 'user'")
+        )
+    engine.dispose()
+    return {
+        "schema": schema,
+        "indexes": indexes,
+        "inserts_per_sec": round(args.users / insert_time, 1),
+        "updates_per_sec": round(args.users / update_time, 1),
+        "file_size_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_NAME"] = os.path.join(tmp, "app.db")
+        sys.path.insert(0, SRC)
+        results = [run(schema, args, tmp) for schema in ("before", "after")]
+    print(json.dumps({"users": args.users, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+# Prueba de carga reproducible: siembra N usuarios sintéticos (CURP/RFC/CP válidos)
+# y ejecuta una mezcla de login, list, get, create, update y delete con la
+# concurrencia indicada, en proceso (ASGI) o contra un uvicorn local.
+#
+#   python benchmarks/bench_load.py --users 10000 --requests 5000 --concurrency 50
+#   python benchmarks/bench_load.py --target uvicorn --uvicorn-workers 2
+#   python benchmarks/bench_load.py --output v2.json --baseline v1.json
+#
+# Imprime throughput y percentiles de latencia en JSON. Con --baseline compara
+# contra un reporte anterior y termina con código 1 si alguna operación empeora
+# más de --max-regression.
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import Counter
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+OPERATIONS = ("login", "list", "get", "create", "update", "delete")
+DEFAULT_MIX = "login=1,list=20,get=50,create=5,update=10,delete=2"
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALNUM = "0123456789" + LETTERS
+
+
+def encode(value: int, alphabet: str, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, len(alphabet))
+        chars.append(alphabet[digit])
+    return "".join(reversed(chars))
+
+
+# Usuario sintético determinista: el índice fija todos los campos únicos
+def synthetic_user(i: int) -> dict:
+    from validation import curp_check_digit
+
+    year, month, day = 1950 + i % 60, i % 12 + 1, i % 28 + 1
+    yymmdd = f"{year % 100:02d}{month:02d}{day:02d}"
+    letters = encode(i, LETTERS, 9)
+    century = "0" if year < 2000 else "A"
+    curp = f"{letters[:4]}{yymmdd}{'HM'[i % 2]}{letters[4:]}{century}"
+    curp += str(curp_check_digit(curp + "0"))
+    rfc = encode(i // 36**3, LETTERS, 4) + yymmdd + encode(i, ALNUM, 3)
+    return {
+        "name": f"Usuario {i:07d}",
+        "email": f"user{i}@bench.mx",
+        "password": "password123",
+        "is_active": True,
+        "rfc": rfc,
+        "curp": curp,
+        "cp": f"{i * 7919 % 99999:05d}",
+        "phone": f"55{i % 10**8:08d}",
+        "address": f"Calle {i % 500} número {i}, Ciudad de México",
+        "date": f"{day:02d}-{month:02d}-{year}",
+    }
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Operación desconocida en --mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+# Secuencia de operaciones fija para una semilla: misma carga en cada versión
+def plan(args, weights: dict[str, float]) -> list[tuple[str, int]]:
+    rng = random.Random(args.seed)
+    names = rng.choices(list(weights), list(weights.values()), k=args.requests)
+    deletes = iter(range(args.users + 1, args.users + 1 + names.count("delete")))
+    # Los ids después de --users se reservan para delete; create usa índices nuevos
+    creates = iter(range(args.users + args.requests + 1, 10**8))
+    steps = []
+    for name in names:
+        if name == "delete":
+            steps.append((name, next(deletes)))
+        elif name == "create":
+            steps.append((name, next(creates)))
+        else:
+            steps.append((name, rng.randint(1, args.users)))
+    return steps
+
+
+# Siembra directa en la base: un solo hash bcrypt compartido por todos los usuarios
+def seed(users: int, extra: int) -> None:
+    from database import SessionLocal, create_db_and_tables, engine
+    from migrations import run_migrations
+    from crud.user import bulk_insert_users
+    from utils import create_admin_user, get_password_hash
+    from validation import validate_record
+
+    create_db_and_tables()
+    run_migrations(engine)
+    db = SessionLocal()
+    create_admin_user(db)
+    hashed = get_password_hash("password123")
+    rows = []
+    for i in range(1, users + extra + 1):
+        user = synthetic_user(i)
+        assert not validate_record(user), validate_record(user)
+        user.pop("password")
+        rows.append({**user, "hashed_password": hashed})
+    bulk_insert_users(db, rows, 1000)
+    db.close()
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+
+    def pct(p: float) -> float:
+        if not values:
+            return 0.0
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 3)
+
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+            "p50": pct(50),
+            "p90": pct(90),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": round(values[-1] * 1000, 3) if values else 0.0,
+        },
+    }
+
+
+async def drive(client, steps: list[tuple[str, int]], concurrency: int, admin: dict):
+    login = await client.post(
+        "/admin/login", data={"username": admin["email"], "password": admin["password"]}
+    )
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['token_de_acceso']}"}
+
+    async def request(name: str, arg: int):
+        if name == "login":
+            return await client.post(
+                "/admin/login",
+                data={"username": admin["email"], "password": admin["password"]},
+            )
+        if name == "list":
+            return await client.get("/users/", params={"limit": 20}, headers=headers)
+        if name == "get":
+            return await client.get(f"/users/{arg}", headers=headers)
+        if name == "create":
+            return await client.post("/users/", json=synthetic_user(arg), headers=headers)
+        if name == "update":
+            body = synthetic_user(arg)
+            body["name"] += " (editado)"
+            return await client.put(f"/users/{arg}", json=body, headers=headers)
+        return await client.delete(f"/users/{arg}", headers=headers)
+
+    results: list[tuple[str, float, int]] = []
+    pending = iter(steps)
+
+    async def worker():
+        for name, arg in pending:
+            start = time.perf_counter()
+            response = await request(name, arg)
+            results.append((name, time.perf_counter() - start, response.status_code))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def report(args, results, elapsed: float) -> dict:
+    operations = {}
+    for name in OPERATIONS:
+        rows = [(latency, code) for op, latency, code in results if op == name]
+        if rows:
+            errors = sum(1 for _, code in rows if code >= 400)
+            operations[name] = summarize([latency for latency, _ in rows], errors, elapsed)
+            operations[name]["status"] = dict(Counter(str(code) for _, code in rows))
+    total_errors = sum(1 for _, _, code in results if code >= 400)
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=SRC,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "config": {
+            "target": args.target,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "seed": args.seed,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "environment": {
+            "git_commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database_profile": os.getenv("DATABASE_PROFILE", "default"),
+            "database_async": os.getenv("DATABASE_ASYNC", "false"),
+        },
+        "total": summarize([latency for _, latency, _ in results], total_errors, elapsed),
+        "operations": operations,
+    }
+
+
+# Regresión: menos throughput o p95 mayor que la línea base más la tolerancia
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    regressions = []
+    for name, stats in current["operations"].items():
+        base = baseline.get("operations", {}).get(name)
+        if not base:
+            continue
+        checks = (
+            ("throughput_rps", stats["throughput_rps"], base["throughput_rps"], -1),
+            ("p95_ms", stats["latency_ms"]["p95"], base["latency_ms"]["p95"], 1),
+        )
+        for metric, value, reference, direction in checks:
+            if reference and (value - reference) / reference * direction > tolerance:
+                regressions.append(
+                    {"operation": name, "metric": metric, "baseline": reference, "current": value}
+                )
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_in_process(args, steps, admin):
+    import httpx
+    from main import app
+
+    # El lifespan de la app (migraciones, pool de bcrypt) también corre aquí
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(client, steps, args.concurrency, admin)
+
+
+async def run_uvicorn(args, steps, admin):
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.uvicorn_workers), "--log-level", "warning",
+        ],
+        cwd=SRC,
+        env=dict(os.environ),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise SystemExit("uvicorn no respondió")
+                await asyncio.sleep(0.2)
+            return await drive(client, steps, args.concurrency, admin)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    # Solo en proceso: el servidor uvicorn usa la configuración de la app
+    parser.add_argument("--bcrypt-rounds", type=int, default=None)
+    parser.add_argument("--output", help="Guarda el reporte JSON en este archivo")
+    parser.add_argument("--baseline", help="Reporte anterior contra el cual comparar")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_NAME"] = os.path.join(tmp.name, "bench.db")
+    # Todo el tráfico sale de una sola IP: el límite de /admin/login lo rechazaría
+    os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, SRC)
+
+    if args.bcrypt_rounds is not None:
+        from hashing import pwd_context
+
+        pwd_context.update(bcrypt__rounds=args.bcrypt_rounds)
+
+    seed(args.users, args.requests)
+    admin = {"email": os.getenv("ADMIN_EMAIL"), "password": os.getenv("ADMIN_PASSWORD")}
+    steps = plan(args, parse_mix(args.mix))
+
+    runner = run_uvicorn if args.target == "uvicorn" else run_in_process
+    results, elapsed = asyncio.run(runner(args, steps, admin))
+
+    result = report(args, results, elapsed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = compare(result, json.load(f), args.max_regression)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    tmp.cleanup()
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Latencia por página a distintas profundidades: offset (skip) contra cursor.
+#
+#   python benchmarks/bench_pagination.py --users 200000 --limit 50
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sort", default="id", choices=["id", "name", "date"])
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_NAME"] = os.path.join(tmp.name, "bench.db")
+    sys.path.insert(0, SRC)
+
+    from sqlalchemy import insert
+    from database import SessionLocal, create_db_and_tables
+    from models.user import User
+    from crud import user as crud
+
+    create_db_and_tables()
+    db = SessionLocal()
+    db.execute(
+        insert(User),
+        [
+            {
+                "name": f"User {i:07d}",
+                "email": f"user{i}@example.com",
+                "date": f"{i % 28 + 1:02d}-{i % 12 + 1:02d}-{1950 + i % 60}",
+            }
+            for i in range(args.users)
+        ],
+    )
+    db.commit()
+
+    def timed(fn, *fn_args) -> tuple[float, list]:
+        best, rows = float("inf"), []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rows = fn(db, *fn_args)
+            best = min(best, time.perf_counter() - start)
+        return best, rows
+
+    depths = [0] + [args.users * pct // 100 for pct in (10, 25, 50, 75, 99)]
+    report = []
+    for depth in depths:
+        # La misma consulta de filas que usa GET /users/, por skip y por cursor
+        offset_time, rows = timed(crud.get_user_rows, depth, args.limit, args.sort)
+        # El cursor equivalente apunta a la fila anterior a la página
+        cursor = None
+        if depth:
+            previous = crud.get_user_rows(db, depth - 1, 1, args.sort)[0]
+            cursor = (getattr(previous, args.sort), previous.id)
+        keyset_time, keyset_rows = timed(
+            crud.get_user_rows, 0, args.limit, args.sort, cursor
+        )
+        assert [u.id for u in rows] == [u.id for u in keyset_rows]
+        report.append(
+            {
+                "depth": depth,
+                "offset_ms": round(offset_time * 1000, 3),
+                "cursor_ms": round(keyset_time * 1000, 3),
+            }
+        )
+        print(
+            f"depth={depth:<8} offset={offset_time * 1000:8.3f}ms "
+            f"cursor={keyset_time * 1000:8.3f}ms",
+            file=sys.stderr,
+        )
+
+    db.close()
+    print(json.dumps({"users": args.users, "limit": args.limit, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
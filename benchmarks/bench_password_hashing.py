@@ -0,0 +1,46 @@
+# Mide logins/segundo (verificaciones bcrypt) según el número de workers del pool.
+#
+#   python benchmarks/bench_password_hashing.py --logins 64 --workers 0 1 2 4
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from hashing import PasswordHasher, pwd_context  # noqa: E402
+
+
+async def run(workers: int, logins: int, hashed: str) -> float:
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+    # Calentamiento: arranca los procesos antes de medir
+    await asyncio.gather(*(hasher.verify("password123", hashed) for _ in range(max(workers, 1))))
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(hasher.verify("password123", hashed) for _ in range(logins))
+    )
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("password123")
+    report = []
+    for workers in args.workers:
+        rate = asyncio.run(run(workers, args.logins, hashed))
+        report.append({"workers": workers, "logins_per_sec": round(rate, 2)})
+        print(f"workers={workers:<3} logins/s={rate:8.2f}", file=sys.stderr)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
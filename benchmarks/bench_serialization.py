@@ -0,0 +1,111 @@
+# Filas por segundo serializadas en GET /users/: objetos ORM validados con UserOut y
+# codificados con json (camino anterior) contra filas de columnas con orjson.
+#
+#   python benchmarks/bench_serialization.py --users 20000 --limit 1000
+#   python benchmarks/bench_serialization.py --fields id,email
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    # Proyección (?fields=) aplicada al camino por filas
+    parser.add_argument("--fields", default=None)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_NAME"] = os.path.join(tmp.name, "bench.db")
+    sys.path.insert(0, SRC)
+
+    from sqlalchemy import insert
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from database import SessionLocal, create_db_and_tables
+    from models.user import User
+    from crud import user as crud
+    from schemas.user import UserOut, USER_OUT_FIELDS
+    from responses import FastJSONResponse, orjson, rows_to_dicts
+
+    create_db_and_tables()
+    db = SessionLocal()
+    db.execute(
+        insert(User),
+        [
+            {
+                "name": f"Usuario {i:07d}",
+                "email": f"user{i}@example.com",
+                "rfc": f"ABCD{i:09d}",
+                "curp": f"CURP{i:014d}",
+                "cp": f"{i % 99999:05d}",
+                "phone": f"55{i:08d}",
+                "address": f"Calle {i % 500} número {i}, Ciudad de México",
+                "date": f"{i % 28 + 1:02d}-{i % 12 + 1:02d}-{1950 + i % 60}",
+            }
+            for i in range(args.users)
+        ],
+    )
+    db.commit()
+    pages = range(0, args.users, args.limit)
+    fields = args.fields.split(",") if args.fields else list(USER_OUT_FIELDS)
+    field = create_model_field("response", list[UserOut], mode="serialization")
+
+    # Lo que hacía FastAPI con response_model: validar cada objeto y codificar con json
+    async def orm_pydantic(skip: int) -> bytes:
+        users = db.query(User).order_by(User.id).offset(skip).limit(args.limit).all()
+        content = await serialize_response(field=field, response_content=users)
+        return JSONResponse(content).body
+
+    async def rows_fast(skip: int) -> bytes:
+        rows = crud.get_user_rows(db, skip, args.limit, fields=fields)
+        return FastJSONResponse(rows_to_dicts(rows, fields)).body
+
+    def run(fn) -> dict:
+        best = float("inf")
+        for _ in range(args.repeat):
+            db.expunge_all()
+            start = time.perf_counter()
+            for skip in pages:
+                body = asyncio.run(fn(skip))
+            best = min(best, time.perf_counter() - start)
+        return {
+            "rows_per_sec": round(args.users / best, 1),
+            "page_ms": round(best / len(pages) * 1000, 3),
+            "last_page_bytes": len(body),
+        }
+
+    # Sin proyección ambos caminos deben producir el mismo JSON
+    if not args.fields:
+        assert json.loads(asyncio.run(orm_pydantic(0))) == json.loads(asyncio.run(rows_fast(0)))
+
+    before = run(orm_pydantic)
+    after = run(rows_fast)
+    db.close()
+    print(
+        json.dumps(
+            {
+                "users": args.users,
+                "limit": args.limit,
+                "fields": fields,
+                "encoder": "orjson" if orjson is not None else "json",
+                "orm_pydantic_json": before,
+                "rows_fast_json": after,
+                "speedup": round(after["rows_per_sec"] / before["rows_per_sec"], 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Escritores concurrentes contra SQLite: perfil "default" frente a "production"
+# (WAL, synchronous=NORMAL, busy_timeout, mmap, cache y pool dimensionado).
+#
+#   python benchmarks/bench_sqlite_profile.py --threads 16 --writes 200
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import threading
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def child(args) -> None:
+    sys.path.insert(0, SRC)
+    from sqlalchemy.exc import OperationalError
+    from database import SessionLocal, create_db_and_tables, DATABASE_PROFILE
+    from models.user import User
+
+    create_db_and_tables()
+    errors = 0
+    lock = threading.Lock()
+
+    def writer(worker: int) -> None:
+        nonlocal errors
+        for i in range(args.writes):
+            db = SessionLocal()
+            try:
+                # Inserción seguida de actualización, como create_user + update_user
+                user = User(name=f"W{worker}", email=f"w{worker}-{i}@example.com")
+                db.add(user)
+                db.commit()
+                user.name = f"W{worker} {i}"
+                db.commit()
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = args.threads * args.writes
+    print(
+        json.dumps(
+            {
+                "profile": DATABASE_PROFILE,
+                "threads": args.threads,
+                "transactions": total * 2,
+                "errors": errors,
+                "tx_per_sec": round((total - errors) * 2 / elapsed, 2),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = []
+    for profile in ("default", "production"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_PROFILE=profile,
+                DATABASE_NAME=os.path.join(tmp, "bench.db"),
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", *sys.argv[1:]],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
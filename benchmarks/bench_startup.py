@@ -0,0 +1,171 @@
+# Tiempo de arranque por worker: N procesos levantan la app (import + lifespan) a la
+# vez sobre una base nueva (cold), sobre una base ya preparada (warm) y heredando la
+# app de un proceso maestro que la importó y preparó la base antes del fork (preload).
+#
+#   python benchmarks/bench_startup.py --workers 4
+#   python benchmarks/bench_startup.py --workers 8 --target-ms 1000
+#
+# Imprime los tiempos en JSON; "ready_ms" va del lanzamiento del worker hasta que el
+# lifespan terminó de arrancar. "legacy_warm_ms" repite lo que hacía antes cada worker
+# con la base ya preparada (create_all x3, migraciones y búsqueda del admin).
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Lo que corre cada worker: importar la app y entrar a su lifespan
+WORKER = """
+import json, time, asyncio, logging
+start = time.perf_counter()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+from main import app
+imported = time.perf_counter()
+
+async def serve():
+    async with app.router.lifespan_context(app):
+        return time.time(), time.perf_counter()
+
+ready_at, ready = asyncio.run(serve())
+print(json.dumps({
+    "ready_at": ready_at,
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+}))
+"""
+
+
+def summarize(workers: list[dict], launched_at: float) -> dict:
+    ready = [(worker.pop("ready_at") - launched_at) * 1000 for worker in workers]
+    return {
+        "workers": len(workers),
+        "max_ready_ms": round(max(ready), 1),
+        "mean_ready_ms": round(sum(ready) / len(ready), 1),
+        "max_import_ms": round(max(worker["import_ms"] for worker in workers), 1),
+        "max_startup_ms": round(max(worker["startup_ms"] for worker in workers), 1),
+        "bootstrap": dict(Counter(worker.get("bootstrap", "?") for worker in workers)),
+    }
+
+
+# Workers independientes (uvicorn --workers): cada uno importa todo desde cero
+def spawn_workers(count: int, env: dict) -> dict:
+    launched_at = time.time()
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER],
+            cwd=SRC,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(count)
+    ]
+    workers = []
+    for process in processes:
+        out, err = process.communicate(timeout=120)
+        if process.returncode != 0:
+            raise SystemExit(err)
+        worker = json.loads(out.strip().splitlines()[-1])
+        # El log de bootstrap indica si el worker preparó la base o solo la consultó
+        for line in err.splitlines():
+            if line.startswith("Arranque: base "):
+                worker["bootstrap"] = line.split()[2]
+        workers.append(worker)
+    return summarize(workers, launched_at)
+
+
+# gunicorn --preload: el maestro importa la app y prepara la base; los hijos hacen fork
+def fork_workers(count: int) -> dict:
+    from main import app
+    from bootstrap import bootstrap
+
+    bootstrap()
+    launched_at = time.time()
+    pipes = []
+    for _ in range(count):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+
+            async def serve():
+                async with app.router.lifespan_context(app):
+                    return time.time()
+
+            start = time.perf_counter()
+            ready_at = asyncio.run(serve())
+            report = {
+                "ready_at": ready_at,
+                "import_ms": 0.0,
+                "startup_ms": (time.perf_counter() - start) * 1000,
+                "bootstrap": "inherited",
+            }
+            os.write(write_fd, json.dumps(report).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append(read_fd)
+    workers = []
+    for read_fd in pipes:
+        with os.fdopen(read_fd) as pipe:
+            workers.append(json.loads(pipe.read()))
+        os.wait()
+    return summarize(workers, launched_at)
+
+
+def legacy_warm_ms(repeat: int = 5) -> float:
+    from database import Base, SessionLocal, engine
+    from migrations import run_migrations
+    from utils import create_admin_user
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(3):
+            Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        with SessionLocal() as db:
+            create_admin_user(db)
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--target-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_NAME"] = os.path.join(tmp.name, "bench.db")
+    os.environ["USER_STATS_RECONCILE_INTERVAL"] = "0"
+    env = dict(os.environ)
+
+    report = {
+        "workers": args.workers,
+        "cpus": os.cpu_count(),
+        "target_ms": args.target_ms,
+    }
+    report["cold"] = spawn_workers(args.workers, env)
+    report["warm"] = spawn_workers(args.workers, env)
+
+    sys.path.insert(0, SRC)
+    os.chdir(SRC)
+    if hasattr(os, "fork"):
+        report["preload"] = fork_workers(args.workers)
+    report["legacy_warm_ms"] = legacy_warm_ms()
+    report["meets_target"] = all(
+        report[scenario]["max_ready_ms"] <= args.target_ms
+        for scenario in ("cold", "warm", "preload")
+        if scenario in report
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Micro-benchmarks de validación: costo por registro y por lote.
+#
+#   python benchmarks/bench_validation.py --records 100000
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from validation import (  # noqa: E402
+    CURP_REGEX,
+    RFC_REGEX,
+    CP_REGEX,
+    PHONE_REGEX,
+    DATE_REGEX,
+    curp_check_digit,
+    validate_record,
+    validate_batch,
+)
+
+
+def make_records(count: int) -> list[dict]:
+    records = []
+    for i in range(count):
+        curp = f"ABCD{i % 90 + 10:02d}0101HDFRRN0"
+        records.append(
+            {
+                "curp": curp + str(curp_check_digit(curp)),
+                "rfc": f"ABCD{i % 90 + 10:02d}0101XYZ",
+                "cp": f"{i % 100000:05d}",
+                "phone": f"55{i % 100000000:08d}",
+                "date": f"{i % 28 + 1:02d}-{i % 12 + 1:02d}-1990",
+            }
+        )
+    return records
+
+
+# Implementación anterior: re.match con el patrón como cadena en cada llamada
+def legacy_validate(record: dict) -> None:
+    for field, pattern in (
+        ("curp", CURP_REGEX),
+        ("rfc", RFC_REGEX),
+        ("cp", CP_REGEX),
+        ("phone", PHONE_REGEX),
+        ("date", DATE_REGEX),
+    ):
+        if not re.match(pattern, record[field]):
+            raise ValueError(field)
+
+
+def measure(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    timings = {
+        "legacy_regex_per_record": measure(lambda: [legacy_validate(r) for r in records]),
+        "validate_record": measure(lambda: [validate_record(r) for r in records]),
+        "validate_batch": measure(lambda: validate_batch(records)),
+    }
+    report = {
+        name: {
+            "total_ms": round(elapsed * 1000, 2),
+            "us_per_record": round(elapsed / args.records * 1e6, 3),
+        }
+        for name, elapsed in timings.items()
+    }
+    print(json.dumps({"records": args.records, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+import config  # noqa: F401  (carga el .env)
+from sqlalchemy import inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import database
+from database import Base
+from models.user import User
+from models.admin import Admin
+from migrations import (
+    MIGRATIONS, applied_versions, lock_schema, run_migrations, stamp_migrations
+)
+from utils import create_admin_user
+
+logger = logging.getLogger(__name__)
+
+# Engines ya preparados en este proceso; un worker creado por fork los hereda
+_prepared: set[Engine] = set()
+
+
+# Todas las migraciones registradas y el admin inicial creado: no hay nada que hacer
+def schema_is_current(conn: Connection) -> bool:
+    if not {version for version, _, _ in MIGRATIONS} <= applied_versions(conn):
+        return False
+    admin = conn.scalar(select(Admin.id).where(Admin.email == os.getenv("ADMIN_EMAIL")))
+    return admin is not None
+
+
+# Transacción exclusiva: el primer worker prepara la base y los demás esperan aquí
+# en lugar de chocar en el DDL o en el email único del admin
+@contextmanager
+def bootstrap_lock(engine: Engine) -> Iterator[Connection]:
+    with engine.connect() as conn:
+        lock_schema(conn)
+        yield conn
+        conn.commit()
+
+
+# Fase única de arranque: esquema, migraciones y admin inicial. Si la base ya está al
+# día basta una consulta y no se ejecuta DDL. Devuelve "current", "created" o "migrated"
+def bootstrap(engine: Engine | None = None) -> str:
+    engine = engine or database.engine
+    if engine in _prepared:
+        return "current"
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        current = schema_is_current(conn)
+    if current:
+        result = "current"
+    else:
+        with bootstrap_lock(engine) as conn:
+            # Otro worker pudo terminar mientras se esperaba el candado
+            if schema_is_current(conn):
+                result = "current"
+            else:
+                fresh = not inspect(conn).has_table(User.__tablename__)
+                Base.metadata.create_all(bind=conn)
+                if fresh:
+                    stamp_migrations(conn)
+                else:
+                    run_migrations(conn)
+                # La sesión se une a la transacción del candado
+                with Session(bind=conn) as db:
+                    create_admin_user(db)
+                result = "created" if fresh else "migrated"
+    _prepared.add(engine)
+    logger.info(
+        "Arranque: base %s en %.1f ms", result, (time.perf_counter() - start) * 1000
+    )
+    return result
+
+
+# Preparar la base antes de levantar los workers (paso de despliegue o contenedor):
+#   cd src && python bootstrap.py && uvicorn main:app --workers 4
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(bootstrap())
@@ -0,0 +1,97 @@
+import os
+import json
+import config  # noqa: F401  (carga el .env)
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from schemas.user import UserCreate
+from validation import validate_batch
+
+BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "10000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+DUPLICATE_MESSAGES = {
+    "email": "el correo electrónico usado ya existe",
+    "rfc": "el RFC usado ya existe",
+    "curp": "el CURP usado ya existe",
+}
+
+
+def invalid_body(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+# Acepta un arreglo JSON o NDJSON (un objeto por línea)
+def parse_records(body: bytes, content_type: str) -> list:
+    try:
+        if "ndjson" in content_type:
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = json.loads(body)
+    except ValueError:
+        raise invalid_body("El cuerpo no es JSON/NDJSON válido")
+
+    if not isinstance(records, list):
+        raise invalid_body("Se esperaba un arreglo de usuarios")
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {BULK_MAX_RECORDS} usuarios por carga",
+        )
+    return records
+
+
+def parse_user(record) -> tuple[UserCreate | None, list[dict]]:
+    try:
+        return UserCreate.model_validate(record), []
+    except ValidationError as e:
+        return None, [
+            {"field": ".".join(str(loc) for loc in error["loc"]), "msg": error["msg"]}
+            for error in e.errors()
+        ]
+
+
+# Valida todos los registros en una pasada; marca repetidos dentro de la misma carga
+def validate_records(records: list) -> tuple[dict[int, UserCreate], dict[int, list]]:
+    users: dict[int, UserCreate] = {}
+    errors: dict[int, list] = {}
+    for index, record in enumerate(records):
+        user, record_errors = parse_user(record)
+        if user is None:
+            errors[index] = record_errors
+        else:
+            users[index] = user
+
+    # Validación de formato por columnas sobre todos los registros a la vez
+    indexes = list(users)
+    for position, field_errors in validate_batch(list(users.values())).items():
+        errors.setdefault(indexes[position], []).extend(field_errors)
+
+    seen: dict[str, set] = {field: set() for field in DUPLICATE_MESSAGES}
+    for index, user in users.items():
+        for field in DUPLICATE_MESSAGES:
+            value = getattr(user, field)
+            if value is None:
+                continue
+            if value in seen[field]:
+                errors.setdefault(index, []).append(
+                    {"field": field, "msg": f"{field} repetido en la carga"}
+                )
+            seen[field].add(value)
+
+    valid = {index: user for index, user in users.items() if index not in errors}
+    return valid, errors
+
+
+def unique_values(users: dict[int, UserCreate]) -> dict[str, list[str]]:
+    return {
+        field: [getattr(u, field) for u in users.values() if getattr(u, field)]
+        for field in DUPLICATE_MESSAGES
+    }
+
+
+def duplicate_errors(user: UserCreate, existing: dict[str, set]) -> list[dict]:
+    return [
+        {"field": field, "msg": message}
+        for field, message in DUPLICATE_MESSAGES.items()
+        if getattr(user, field) in existing[field]
+    ]
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import config  # noqa: F401  (carga el .env)
+
+
+# Caché LRU acotada con expiración por entrada y contadores de aciertos/fallos
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    # Los contadores de aciertos/fallos se conservan: son acumulados para las métricas
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Backends intercambiables para cachés de respuestas serializadas (bytes)
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        self._generations: dict[Hashable, int] = {}
+        # Al vaciar las generaciones cambia la época, así ninguna lectura previa coincide
+        self._epoch = 0
+
+    async def generation(self, key: Hashable) -> int:
+        return (self._epoch << 32) + self._generations.get(key, 0)
+
+    async def get(self, key: Hashable) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    # Solo guarda si nadie invalidó la llave mientras se leía de la base
+    async def set(self, key: Hashable, value: bytes, generation: int = 0) -> None:
+        if await self.generation(key) == generation:
+            self._cache.set(key, value)
+
+    async def delete(self, key: Hashable) -> None:
+        if len(self._generations) >= self._cache.maxsize:
+            self._generations.clear()
+            self._epoch += 1
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Guarda el valor solo si la generación de la llave sigue siendo la leída
+_SET_IF_GENERATION = """
+if (tonumber(redis.call('GET', KEYS[1])) or 0) == tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+end
+"""
+
+# Sube la generación (visible para todos los workers) y borra el valor
+_INVALIDATE = """
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+"""
+
+
+# Backend compatible con Redis (redis.asyncio o cualquier cliente con get/eval).
+# Las generaciones viven en Redis, así una invalidación en un worker impide que otro
+# guarde lo que leyó antes de ella
+class RedisBackend:
+    # Segundos que se conserva la generación tras la última invalidación; debe superar
+    # con holgura lo que tarda una lectura de la base
+    generation_ttl = 3600
+
+    def __init__(self, client, ttl: float, prefix: str = ""):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float, prefix: str = "") -> "RedisBackend":
+        import redis.asyncio
+
+        return cls(redis.asyncio.Redis.from_url(url), ttl, prefix)
+
+    async def generation(self, key: Hashable) -> int:
+        return int(await self.client.get(f"{self.prefix}gen:{key}") or 0)
+
+    async def get(self, key: Hashable) -> Optional[bytes]:
+        value = await self.client.get(f"{self.prefix}{key}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: Hashable, value: bytes, generation: int = 0) -> None:
+        await self.client.eval(
+            _SET_IF_GENERATION, 2, f"{self.prefix}gen:{key}", f"{self.prefix}{key}",
+            generation, value, max(int(self.ttl), 1),
+        )
+
+    async def delete(self, key: Hashable) -> None:
+        await self.client.eval(
+            _INVALIDATE, 2, f"{self.prefix}gen:{key}", f"{self.prefix}{key}",
+            self.generation_ttl,
+        )
+
+    # Las entradas expiran solas en Redis; los contadores son acumulados
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Backend nulo: desactiva la caché sin condicionales en las rutas
+class NullBackend:
+    async def generation(self, key: Hashable) -> int:
+        return 0
+
+    async def get(self, key: Hashable) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: Hashable, value: bytes, generation: int = 0) -> None:
+        pass
+
+    async def delete(self, key: Hashable) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+
+def create_backend(kind: str, maxsize: int, ttl: float, prefix: str = ""):
+    if kind == "memory":
+        return MemoryBackend(maxsize, ttl)
+    if kind == "redis":
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        return RedisBackend.from_url(url, ttl, prefix)
+    if kind == "none":
+        return NullBackend()
+    raise ValueError(f"Backend de caché desconocido: {kind}")
+
+
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Respuestas UserOut serializadas de GET /users/{user_id}
+user_cache = create_backend(USER_CACHE_BACKEND, USER_CACHE_SIZE, USER_CACHE_TTL, "user:")
+
+
+# Workers de este servidor: WEB_CONCURRENCY (el valor por defecto de gunicorn y de
+# uvicorn) o el --workers de la línea de uvicorn, que sus workers heredan en sys.argv
+def worker_count(argv: list[str] | None = None) -> int:
+    argv = sys.argv if argv is None else argv
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # uvicorn main:app o python -m uvicorn (argv[0] es .../uvicorn/__main__.py)
+    if argv and "uvicorn" in argv[0]:
+        for i, arg in enumerate(argv[1:], 1):
+            if arg.startswith("--workers="):
+                workers = int(arg.split("=", 1)[1])
+            elif arg == "--workers" and i + 1 < len(argv):
+                workers = int(argv[i + 1])
+    return workers
+
+
+# La caché memory solo se invalida en el proceso que escribió: con varios workers los
+# demás servirían usuarios viejos hasta USER_CACHE_TTL
+def check_workers(workers: int) -> None:
+    if workers > 1 and USER_CACHE_BACKEND == "memory":
+        raise RuntimeError(
+            f"USER_CACHE_BACKEND=memory no es válido con {workers} workers: "
+            "usa USER_CACHE_BACKEND=redis (compartida) o none, o un solo worker"
+        )
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
+import config  # noqa: F401  (carga el .env)
+
+from database import SessionLocal, release, run_db
+from crud.user import compact_user_changes, get_user_changes
+
+# Segundos que se conservan los cambios de GET /users/changes (7 días por defecto)
+USER_CHANGES_RETENTION = float(os.getenv("USER_CHANGES_RETENTION", str(7 * 24 * 3600)))
+# Segundos entre compactaciones; 0 la desactiva
+USER_CHANGES_COMPACT_INTERVAL = float(os.getenv("USER_CHANGES_COMPACT_INTERVAL", "3600"))
+# Máximo que una consulta (long-poll) o un stream SSE quedan abiertos
+USER_CHANGES_MAX_WAIT = float(os.getenv("USER_CHANGES_MAX_WAIT", "30"))
+# Cada cuánto se vuelve a consultar mientras se espera: cubre las escrituras de otros
+# workers o fuera de la API; las de este proceso despiertan a la espera de inmediato
+USER_CHANGES_POLL_INTERVAL = float(os.getenv("USER_CHANGES_POLL_INTERVAL", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+# Aviso dentro del proceso: las rutas de escritura despiertan a los clientes en espera.
+# Quien espera toma generation antes de consultar; si hubo un aviso entre la consulta
+# y la espera, wait regresa de inmediato
+class ChangeNotifier:
+    def __init__(self):
+        self.generation = 0
+        self._event: asyncio.Event | None = None
+
+    def notify(self) -> None:
+        self.generation += 1
+        event, self._event = self._event, None
+        if event is not None:
+            event.set()
+
+    async def wait(self, generation: int, timeout: float) -> None:
+        if generation != self.generation:
+            return
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+change_notifier = ChangeNotifier()
+
+
+def compact(retention: float = USER_CHANGES_RETENTION) -> int:
+    with SessionLocal() as db:
+        return compact_user_changes(db, time.time() - retention)
+
+
+# Tarea de fondo del lifespan: borra los cambios que pasaron la ventana de retención
+async def compact_periodically(interval: float = USER_CHANGES_COMPACT_INTERVAL) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await asyncio.to_thread(compact)
+        except Exception:
+            logger.exception("No se pudo compactar el registro de cambios de usuarios")
+            continue
+        if removed:
+            logger.info("Cambios de usuarios compactados: %s", removed)
+
+
+# Filas de crud.user.get_user_changes a entradas de UserChange
+def change_entries(rows, fields: Sequence[str]) -> list[dict]:
+    return [
+        {
+            "seq": row[0],
+            "op": row[1],
+            "user_id": row[2],
+            "version": row[3],
+            "changed_at": datetime.fromtimestamp(row[4], timezone.utc).isoformat(),
+            "user": (
+                dict(zip(fields, row[6:]))
+                if row[5] is not None and row[1] != "delete"
+                else None
+            ),
+        }
+        for row in rows
+    ]
+
+
+# Server-Sent Events: un evento por cambio (id = seq, para reanudar con Last-Event-ID).
+# El stream se cierra tras duration segundos y el navegador se reconecta solo; entre
+# consultas la conexión vuelve al pool
+async def change_events(
+    db, since: int, limit: int, fields: Sequence[str], duration: float
+) -> AsyncIterator[str]:
+    deadline = time.monotonic() + duration
+    try:
+        yield "retry: 1000\n\n"
+        while True:
+            generation = change_notifier.generation
+            rows = await run_db(db, get_user_changes, since, limit, fields)
+            await release(db)
+            for entry in change_entries(rows, fields):
+                data = json.dumps(entry, ensure_ascii=False)
+                yield f"id: {entry['seq']}\nevent: {entry['op']}\ndata: {data}\n\n"
+            if rows:
+                since = rows[-1][0]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if len(rows) < limit:
+                await change_notifier.wait(
+                    generation, min(remaining, USER_CHANGES_POLL_INTERVAL)
+                )
+    finally:
+        await release(db)
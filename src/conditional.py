@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Sequence
+from fastapi import Request, Response, status
+
+
+def make_etag(user_id: int, version: int) -> str:
+    return f'"{user_id}.{version}"'
+
+
+# ETag de una proyección (?fields=): otra representación, así que no coincide con la del
+# usuario completo ni con la de otras columnas; tampoco sirve como If-Match de un PUT
+def projection_etag(etag: str, fields: Sequence[str]) -> str:
+    digest = hashlib.sha1(",".join(fields).encode()).hexdigest()[:16]
+    return f'{etag[:-1]}.{digest}"'
+
+
+# ETag de una página: cambia si cambia cualquier fila o el conjunto de filas
+def page_etag(rows: Iterable[tuple[int, int]], *parts: object) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(f"{part};".encode())
+    for user_id, version in rows:
+        digest.update(f"{user_id}.{version},".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def to_utc(value: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona horaria; se guardan siempre en UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return format_datetime(to_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def parse_etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+# Comparación fuerte: las ETags débiles (W/) nunca coinciden
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if header is None:
+        return False
+    tags = parse_etags(header)
+    return "*" in tags or etag in tags
+
+
+def parse_version(header: str, user_id: int) -> Optional[int]:
+    for tag in parse_etags(header):
+        try:
+            tag_id, version = tag.strip('"').split(".", 1)
+            if int(tag_id) == user_id:
+                return int(version)
+        except ValueError:
+            continue
+    return None
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[str]
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(last_modified) <= to_utc(since)
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[str]) -> dict:
+    headers = {"ETag": etag}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[str]) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified),
+    )
+
+
+# Entradas de caché: ETag y Last-Modified viajan junto al cuerpo serializado
+def pack_entry(etag: str, last_modified: Optional[str], payload: bytes) -> bytes:
+    return f"{etag}\n{last_modified or ''}\n".encode() + payload
+
+
+def unpack_entry(entry: bytes) -> tuple[str, Optional[str], bytes]:
+    etag, last_modified, payload = entry.split(b"\n", 2)
+    return etag.decode(), last_modified.decode() or None, payload
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Único punto de carga del .env: los módulos importan config antes de leer os.getenv
+# y Python lo ejecuta una sola vez por proceso
+load_dotenv()
@@ -0,0 +1,67 @@
+from sqlalchemy import select, insert, update, delete, Row
+from sqlalchemy.orm import Session
+from database import write_returning
+from models.admin import Admin
+from schemas.admin import AdminCreate, AdminUpdate, ADMIN_OUT_FIELDS
+
+
+# Funciones síncronas sobre la sesión; las rutas las ejecutan con database.run_db.
+# Solo las columnas de AdminOut, como filas (sin hidratar objetos ORM)
+def get_admin_rows(db: Session) -> list[Row]:
+    query = select(*(getattr(Admin, field) for field in ADMIN_OUT_FIELDS))
+    return db.execute(query.order_by(Admin.id)).all()
+
+
+def get_admin(db: Session, admin_id: int) -> Admin | None:
+    return db.query(Admin).filter(Admin.id == admin_id).first()
+
+
+def get_admin_by_email(db: Session, email: str) -> Admin | None:
+    return db.query(Admin).filter(Admin.email == email).first()
+
+
+# Escrituras con RETURNING: la unicidad del email la resuelve la restricción
+def create_admin(db: Session, admin: AdminCreate, hashed_password: str) -> Admin:
+    statement = (
+        insert(Admin)
+        .values(
+            name=admin.name,
+            email=admin.email,
+            hashed_password=hashed_password,
+            role=admin.role,
+            is_active=admin.is_active,
+        )
+        .returning(Admin)
+    )
+    return write_returning(db, statement)
+
+
+# Devuelve el admin actualizado y su email anterior (para invalidar solo esa entrada
+# de la caché); el SELECT previo bloquea la fila en Postgres hasta el UPDATE
+def update_admin(
+    db: Session, admin_id: int, admin_update: AdminUpdate
+) -> tuple[Admin | None, str | None]:
+    # password no es una columna; se conserva el comportamiento de ignorarlo aquí
+    values = admin_update.model_dump(exclude_unset=True, exclude={"password"})
+    if not values:
+        return get_admin(db, admin_id), None
+    previous_email = db.scalar(
+        select(Admin.email).where(Admin.id == admin_id).with_for_update()
+    )
+    if previous_email is None:
+        db.rollback()
+        return None, None
+    statement = (
+        update(Admin)
+        .where(Admin.id == admin_id)
+        .values(**values)
+        .returning(Admin)
+        .execution_options(populate_existing=True)
+    )
+    return write_returning(db, statement), previous_email
+
+
+# Devuelve el email del admin eliminado (para invalidar su caché) o None si no existía
+def delete_admin(db: Session, admin_id: int) -> str | None:
+    statement = delete(Admin).where(Admin.id == admin_id).returning(Admin.email)
+    return write_returning(db, statement)
@@ -0,0 +1,356 @@
+from typing import Iterator, Sequence
+from sqlalchemy import (
+    and_, select, insert, update, delete, func, literal, literal_column, text, tuple_,
+    union_all, Row, Select, String,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from database import write_returning
+from models.user import User, user_changes, user_stats, CP_PREFIX_LENGTH
+import pagination
+from filters import user_conditions
+from schemas.user import UserCreate, UserFilters, UserUpdate, USER_OUT_FIELDS
+
+
+# Columnas pedidas (por defecto las de UserOut) seguidas de las que hacen falta
+# para el cursor y la ETag; las filas se serializan con solo las primeras
+def user_columns(fields: Sequence[str] = USER_OUT_FIELDS, *required: str) -> list:
+    names = dict.fromkeys([*fields, *required, "id", "version", "updated_at"])
+    return [getattr(User, name) for name in names]
+
+
+# Funciones síncronas sobre la sesión; las rutas las ejecutan con database.run_db
+def get_user(db: Session, user_id: int) -> User | None:
+    return db.query(User).filter(User.id == user_id).first()
+
+
+# Un usuario con solo las columnas pedidas (proyección de GET /users/{user_id})
+def get_user_row(db: Session, user_id: int, fields: Sequence[str]) -> Row | None:
+    query = select(*user_columns(fields)).where(User.id == user_id)
+    return db.execute(query).first()
+
+
+# Página de usuarios por offset (skip) o por cursor, como filas de columnas sin
+# hidratar objetos ORM; las rutas de listado las serializan directamente
+def get_user_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    sort: str = "id",
+    cursor: tuple | None = None,
+    filters: UserFilters | None = None,
+    fields: Sequence[str] = USER_OUT_FIELDS,
+) -> list[Row]:
+    query = select(*user_columns(fields, sort)).where(*user_conditions(filters))
+    if cursor is not None:
+        query = query.where(pagination.after(sort, *cursor))
+    query = query.order_by(*pagination.order_by(sort)).limit(limit)
+    if skip:
+        query = query.offset(skip)
+    return db.execute(query).all()
+
+
+# INSERT ... RETURNING: la unicidad de email/RFC/CURP la resuelven las restricciones
+# (IntegrityError), sin SELECT previo ni refresh posterior
+def create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+    statement = (
+        insert(User)
+        .values(
+            name=user.name,
+            email=user.email,
+            hashed_password=hashed_password,
+            is_active=user.is_active,
+            rfc=user.rfc,
+            curp=user.curp,
+            cp=user.cp,
+            phone=user.phone,
+            address=user.address,
+            date=user.date,
+        )
+        .returning(User)
+    )
+    return write_returning(db, statement)
+
+
+# UPDATE ... RETURNING que incrementa la versión; con expected_version (If-Match)
+# solo actualiza si la fila sigue en esa versión y si no lanza StaleDataError
+def update_user(
+    db: Session,
+    user_id: int,
+    user_update: UserUpdate,
+    expected_version: int | None = None,
+) -> User | None:
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**user_update.model_dump(exclude_unset=True), version=User.version + 1)
+        .returning(User)
+        .execution_options(populate_existing=True)
+    )
+    if expected_version is not None:
+        statement = statement.where(User.version == expected_version)
+
+    db_user = write_returning(db, statement)
+    # Solo en el camino de error se distingue "no existe" de "cambió de versión"
+    if db_user is None and expected_version is not None:
+        if get_user(db, user_id) is not None:
+            raise StaleDataError(f"user {user_id} version {expected_version}")
+    return db_user
+
+
+def delete_user(db: Session, user_id: int) -> bool:
+    statement = delete(User).where(User.id == user_id).returning(User.id)
+    return write_returning(db, statement) is not None
+
+
+# Consulta por columnas (sin hidratar objetos ORM) para exportaciones en streaming
+def export_users_query(
+    fields: list[str], filters: UserFilters | None = None
+) -> Select:
+    query = select(*(getattr(User, field) for field in fields))
+    return query.where(*user_conditions(filters)).order_by(User.id)
+
+
+UNIQUE_FIELDS = ("email", "rfc", "curp")
+
+
+# Valores de email/RFC/CURP que ya existen, con una consulta por bloque de registros
+def find_existing_unique_values(
+    db: Session, values: dict[str, list[str]], chunk_size: int = 500
+) -> dict[str, set[str]]:
+    existing: dict[str, set[str]] = {field: set() for field in UNIQUE_FIELDS}
+    total = max((len(items) for items in values.values()), default=0)
+    for start in range(0, total, chunk_size):
+        queries = [
+            select(literal(field).label("field"), getattr(User, field).label("value"))
+            .where(getattr(User, field).in_(values[field][start:start + chunk_size]))
+            for field in UNIQUE_FIELDS
+            if values.get(field, [])[start:start + chunk_size]
+        ]
+        if queries:
+            for field, value in db.execute(union_all(*queries)):
+                existing[field].add(value)
+    return existing
+
+
+# Inserta en transacciones por bloque con executemany; devuelve el id de cada fila
+# o None si violó una restricción de unicidad
+def bulk_insert_users(
+    db: Session, rows: list[dict], chunk_size: int = 500
+) -> list[int | None]:
+    statement = insert(User).returning(User.id, sort_by_parameter_order=True)
+    ids: list[int | None] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            ids.extend(db.scalars(statement, chunk).all())
+            db.commit()
+        except IntegrityError:
+            # Otra escritura concurrente ganó la carrera: se aísla fila por fila
+            db.rollback()
+            for row in chunk:
+                try:
+                    ids.append(db.scalar(statement, row))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    ids.append(None)
+    return ids
+
+
+# Bloques de ids de una operación en lote: la lista dada, ordenada, o los que cumplen
+# las condiciones, leídos por keyset (id > último) para avanzar aunque la fila cambie
+def _id_chunks(
+    db: Session, ids: list[int] | None, conditions: list, chunk_size: int
+) -> Iterator[list[int]]:
+    if ids is not None:
+        ordered = sorted(set(ids))
+        for start in range(0, len(ordered), chunk_size):
+            yield ordered[start:start + chunk_size]
+        return
+    last_id = 0
+    while True:
+        query = select(User.id).where(*conditions, User.id > last_id)
+        chunk = db.scalars(query.order_by(User.id).limit(chunk_size)).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+# Falla de un bloque de _bulk_write: affected son los ids de los bloques anteriores,
+# ya confirmados (hay que invalidarlos igual)
+class BulkWriteError(Exception):
+    def __init__(self, affected: list[int]):
+        super().__init__(f"Escritura en lote interrumpida tras {len(affected)} usuarios")
+        self.affected = affected
+
+
+# Un UPDATE/DELETE ... RETURNING por bloque, cada bloque en su propia transacción
+# (el candado de escritura de SQLite se libera entre bloques); devuelve los ids afectados
+def _bulk_write(db: Session, statement, ids, conditions, chunk_size) -> list[int]:
+    affected: list[int] = []
+    try:
+        for chunk in _id_chunks(db, ids, conditions, chunk_size):
+            chunk_statement = statement.where(User.id.in_(chunk), *conditions)
+            written = db.scalars(
+                chunk_statement.returning(User.id),
+                execution_options={"synchronize_session": False},
+            ).all()
+            db.commit()
+            affected += written
+    except Exception as e:
+        db.rollback()
+        raise BulkWriteError(affected) from e
+    return affected
+
+
+def bulk_update_users(
+    db: Session,
+    values: dict,
+    ids: list[int] | None,
+    conditions: list,
+    chunk_size: int = 500,
+) -> list[int]:
+    statement = update(User).values(**values, version=User.version + 1)
+    return _bulk_write(db, statement, ids, conditions, chunk_size)
+
+
+def bulk_delete_users(
+    db: Session, ids: list[int] | None, conditions: list, chunk_size: int = 500
+) -> list[int]:
+    return _bulk_write(db, delete(User), ids, conditions, chunk_size)
+
+
+# Totales mantenidos por los triggers de user_stats: una lectura de pocas filas
+def get_user_stats(db: Session) -> dict:
+    counts = dict(db.execute(select(user_stats.c.name, user_stats.c.count)).all())
+    total, active = counts.get("total", 0), counts.get("active", 0)
+    return {
+        "total": total,
+        "active": active,
+        "inactive": total - active,
+        "cp_prefixes": {
+            name[3:]: count
+            for name, count in sorted(counts.items())
+            if name.startswith("cp:") and count > 0
+        },
+    }
+
+
+# Conteo real con un recorrido completo de user; solo para reconciliar
+def counted_user_stats() -> Select:
+    prefix = literal("cp:") + func.substr(User.cp, 1, CP_PREFIX_LENGTH, type_=String)
+    return union_all(
+        select(literal("total"), func.count()).select_from(User),
+        select(literal("active"), func.count()).where(User.is_active.is_(True)),
+        select(prefix, func.count()).where(User.cp != "").group_by(prefix),
+    )
+
+
+# Reemplaza los contadores por el conteo real y devuelve las diferencias encontradas
+# como {nombre: (guardado, real)}. En SQLite el DELETE toma el candado de escritura
+# antes de contar; en Postgres los triggers concurrentes esperan al commit
+def reconcile_user_stats(db: Session) -> dict[str, tuple[int, int]]:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE user_stats IN EXCLUSIVE MODE"))
+    columns = (user_stats.c.name, user_stats.c.count)
+    stored = dict(db.execute(delete(user_stats).returning(*columns)).all())
+    statement = insert(user_stats).from_select(["name", "count"], counted_user_stats())
+    actual = dict(db.execute(statement.returning(*columns)).all())
+    db.commit()
+    return {
+        name: (stored.get(name, 0), actual.get(name, 0))
+        for name in sorted(stored.keys() | actual.keys())
+        if stored.get(name, 0) != actual.get(name, 0)
+    }
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# xid más antiguo aún en curso: todo lo anterior ya se confirmó o se descartó
+SNAPSHOT_XMIN = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+# Orden de entrega del registro de cambios. En SQLite el único escritor confirma en
+# orden de seq. En Postgres es (xid, seq) y solo hasta SNAPSHOT_XMIN: un cambio cuya
+# transacción sigue abierta (o una anterior a ella) espera a la siguiente consulta
+def _change_order(postgres: bool) -> list:
+    c = user_changes.c
+    return [c.xid, c.seq] if postgres else [c.seq]
+
+
+# seq del último cambio en orden de entrega (el "seq actual" de un cliente al día)
+def _last_change(postgres: bool, deliverable: bool = True) -> Select:
+    c = user_changes.c
+    if not postgres:
+        return select(func.max(c.seq))
+    query = select(c.seq).order_by(c.xid.desc(), c.seq.desc()).limit(1)
+    return query.where(c.xid < SNAPSHOT_XMIN) if deliverable else query
+
+
+# Cambios posteriores a since en orden de entrega, seguidos de las columnas del usuario
+# cuando su versión actual es la de ese cambio (nulas si cambió después o ya no existe):
+# (seq, op, user_id, version, changed_at, id, *fields). since es el seq del último
+# cambio recibido; en Postgres se traduce a su posición (xid, seq)
+def get_user_changes(
+    db: Session, since: int, limit: int, fields: Sequence[str] = USER_OUT_FIELDS
+) -> list[Row]:
+    c = user_changes.c
+    postgres = _is_postgres(db)
+    query = select(
+        c.seq, c.op, c.user_id, c.version, c.changed_at, User.id,
+        *(getattr(User, name) for name in fields),
+    ).outerjoin(User, and_(User.id == c.user_id, User.version == c.version))
+    if not postgres:
+        query = query.where(c.seq > since)
+    else:
+        query = query.where(c.xid < SNAPSHOT_XMIN)
+        if since:
+            previous = user_changes.alias("previous")
+            since_xid = select(previous.c.xid).where(previous.c.seq == since)
+            query = query.where(
+                tuple_(c.xid, c.seq) > tuple_(since_xid.scalar_subquery(), literal(since))
+            )
+    return db.execute(query.order_by(*_change_order(postgres)).limit(limit)).all()
+
+
+# seq actual (0 si nunca hubo cambios) y si since sigue siendo un punto de partida
+# válido: False si ya se compactaron cambios posteriores a él
+def get_user_change_head(db: Session, since: int | None) -> tuple[int, bool]:
+    c = user_changes.c
+    postgres = _is_postgres(db)
+    oldest, head = db.execute(
+        select(func.min(c.seq), _last_change(postgres).scalar_subquery())
+    ).one()
+    if oldest is None:
+        return head or 0, True
+    if postgres and since:
+        # Fuera del orden de seq el cursor solo existe mientras exista su fila
+        exists = db.scalar(select(c.seq).where(c.seq == since)) is not None
+        return head or 0, exists
+    return head or 0, since is None or since >= oldest - 1
+
+
+# Borra por lotes los cambios anteriores a before. El último (en orden de entrega) se
+# conserva siempre: su seq sigue siendo el cursor válido de un cliente al día
+def compact_user_changes(db: Session, before: float, batch_size: int = 1000) -> int:
+    c = user_changes.c
+    newest = _last_change(_is_postgres(db), deliverable=False).scalar_subquery()
+    removed = 0
+    while True:
+        batch = (
+            select(c.seq)
+            .where(c.changed_at < before, c.seq != newest)
+            .order_by(c.seq)
+            .limit(batch_size)
+        )
+        statement = delete(user_changes).where(c.seq.in_(batch.scalar_subquery()))
+        result = db.execute(statement)
+        db.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
@@ -1,20 +1,112 @@
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-
-load_dotenv()
+import config  # noqa: F401  (carga el .env)
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from starlette.concurrency import run_in_threadpool
 
 db_path = os.path.join(os.path.dirname(__file__), os.getenv("DATABASE_NAME"))
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") +  db_path
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Modo async opcional: aiosqlite para SQLite, asyncpg para Postgres
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# "production" aplica WAL, pragmas y un pool dimensionado para escrituras concurrentes
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negativo = KiB: -65536 son 64 MiB de caché de páginas por conexión
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "temp_store": "MEMORY",
+}
+
+# Las rutas async usan la sesión fuera del hilo donde se creó la conexión
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+
+def engine_options(is_async: bool = False) -> dict:
+    options = {}
+    if IS_SQLITE and DATABASE_PROFILE == "production":
+        # Con WAL los lectores no bloquean al escritor: un pool por hilo de trabajo
+        options.update(
+            pool_size=int(os.getenv("DATABASE_POOL_SIZE", "8")),
+            max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", "16")),
+            pool_timeout=float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+        )
+        if is_async:
+            # aiosqlite usa NullPool por defecto; se reutilizan las conexiones
+            options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def configure_engine(sync_engine) -> None:
+    if IS_SQLITE and DATABASE_PROFILE == "production":
+        event.listen(sync_engine, "connect", apply_sqlite_pragmas)
+
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **engine_options()
+)
+configure_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def get_async_database_url(url: str) -> str:
+    for prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        get_async_database_url(SQLALCHEMY_DATABASE_URL), **engine_options(True)
+    )
+    configure_engine(async_engine.sync_engine)
+    # expire_on_commit=False evita IO implícito al serializar tras el commit
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+# Tras un fork (gunicorn --preload) el worker abre sus propias conexiones en lugar de
+# compartir las del proceso maestro
+def dispose_after_fork() -> None:
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=dispose_after_fork)
+
+
 def create_db_and_tables():
     Base.metadata.create_all(bind=engine)
 
@@ -24,3 +116,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependencia usada por las rutas según el modo configurado
+get_session = get_async_db if DATABASE_ASYNC else get_db
+
+
+# Ejecuta una función síncrona de crud con la sesión, sin bloquear el event loop
+async def run_db(db, fn, *args, **kwargs):
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
+
+
+# Devuelve la conexión al pool entre consultas de una solicitud larga (long-poll, SSE);
+# la sesión sigue usable y toma otra conexión en la siguiente consulta
+async def release(db) -> None:
+    if isinstance(db, Session):
+        await run_in_threadpool(db.close)
+    else:
+        await db.close()
+
+
+# Ejecuta un INSERT/UPDATE/DELETE ... RETURNING y confirma en la misma ida a la base.
+# El objeto se separa de la sesión para que el commit no lo expire (sin SELECT extra)
+def write_returning(db: Session, statement):
+    try:
+        result = db.scalar(statement)
+        if inspect(result, raiseerr=False) is not None:
+            db.expunge(result)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return result
+
+
+# Campo cuya restricción de unicidad falló (SQLite: "user.email", Postgres: "ix_user_email")
+def unique_violation(error: IntegrityError, table: str, fields) -> str | None:
+    message = str(error.orig)
+    for field in fields:
+        if f"{table}.{field}" in message or f"ix_{table}_{field}" in message:
+            return field
+    return None
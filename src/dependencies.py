@@ -1,15 +1,19 @@
 import os
-from dotenv import load_dotenv
+import time
+import hashlib
+import config  # noqa: F401  (carga el .env)
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from models.user import User
 from models.admin import Admin
-from database import get_db
+from database import get_session, run_db
+from replicas import get_read_session
+from crud import admin as crud_admin
 from utils import get_password_hash
-
-load_dotenv()
+from cache import TTLCache
+from metrics import dependency_duration_seconds, jwt_decode_duration_seconds
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -17,10 +21,26 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+ADMIN_CACHE_SIZE = int(os.getenv("ADMIN_CACHE_SIZE", "1024"))
+# Pocos segundos: la caché es por proceso y la invalidación solo llega al worker que
+# atendió el PUT/DELETE; en los demás un admin eliminado o desactivado sigue
+# autenticando hasta ADMIN_CACHE_TTL
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "5"))
+
+# Claims ya verificados, indexados por el digest del token, hasta su "exp"
+token_cache = TTLCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL)
+# Datos del admin por email; se invalidan al actualizar o eliminar el admin (en este
+# proceso; en los demás vencen a los ADMIN_CACHE_TTL segundos)
+admin_cache = TTLCache(ADMIN_CACHE_SIZE, ADMIN_CACHE_TTL)
+
+ADMIN_CACHE_FIELDS = ("id", "name", "email", "role", "is_active")
+
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="No se pudieron validar los credenciales",
-    headers=(),
+    headers={"WWW-Authenticate": "Bearer"},
 )
 
 
@@ -34,36 +54,85 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
-def get_current_admin(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> Admin:
-    try:
+def decode_access_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        role: str = payload.get("role")
-        if role is None or role != "admin":
+        exp = payload.get("exp")
+        token_cache.set(key, payload, exp - time.time() if exp else None)
+    return payload
+
+
+def cache_admin(admin: Admin) -> None:
+    admin_cache.set(
+        admin.email, {field: getattr(admin, field) for field in ADMIN_CACHE_FIELDS}
+    )
+
+
+def invalidate_admin_cache(*emails: str | None) -> None:
+    for email in emails:
+        if email:
+            admin_cache.delete(email)
+
+
+def auth_cache_stats() -> dict:
+    return {"token": token_cache.stats(), "admin": admin_cache.stats()}
+
+
+def get_or_create_admin(db: Session, email: str, role: str) -> Admin:
+    admin = db.query(Admin).filter(Admin.email == email).first()
+    if admin is None:
+        # Create the admin if it doesn't exist
+        admin = Admin(
+            name="Admin",
+            email=email,
+            hashed_password=get_password_hash("password123"),
+            role=role,
+            is_active=True,
+        )
+        db.add(admin)
+        db.commit()
+        db.refresh(admin)
+    return admin
+
+
+async def get_current_admin(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+    read_db: Session = Depends(get_read_session),
+) -> Admin:
+    # Latencia total de la autenticación: token, caché de admins y base
+    with dependency_duration_seconds.time(dependency="get_current_admin"):
+        try:
+            with jwt_decode_duration_seconds.time():
+                payload = decode_access_token(token)
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+            role: str = payload.get("role")
+            if role is None or role != "admin":
+                raise credentials_exception
+            cached = admin_cache.get(email)
+            if cached is not None:
+                # Instancia desligada de la sesión, solo para lectura
+                admin = Admin(**cached)
+            else:
+                # Búsqueda en una réplica; el alta, si falta, solo puede ir a la primaria
+                admin = await run_db(read_db, crud_admin.get_admin_by_email, email)
+                if admin is None:
+                    admin = await run_db(db, get_or_create_admin, email, role)
+                cache_admin(admin)
+            # Un admin desactivado deja de autenticar: en este worker de inmediato (la
+            # actualización invalida su entrada), en los demás al vencer ADMIN_CACHE_TTL
+            if not admin.is_active:
+                raise credentials_exception
+            return admin
+        except JWTError:
             raise credentials_exception
-        admin = db.query(Admin).filter(Admin.email == email).first()
-        if admin is None:
-            # Create the admin if it doesn't exist
-            admin = Admin(
-                name="Admin",
-                email=email,
-                hashed_password=get_password_hash("password123"),
-                role=role,
-                is_active=True,
-            )
-            db.add(admin)
-            db.commit()
-            db.refresh(admin)
-        return admin
-    except JWTError:
-        raise credentials_exception
-
-
-def get_admin_user(current_user: User = Depends(get_current_admin)) -> User:
+
+
+async def get_admin_user(current_user: User = Depends(get_current_admin)) -> User:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="No hay permisos de admin"
@@ -71,7 +140,7 @@ def get_admin_user(current_user: User = Depends(get_current_admin)) -> User:
     return current_user
 
 
-def get_read_write_user(current_user: User = Depends(get_current_admin)) -> User:
+async def get_read_write_user(current_user: User = Depends(get_current_admin)) -> User:
     if current_user.role not in ["admin", "read_write"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -80,7 +149,7 @@ def get_read_write_user(current_user: User = Depends(get_current_admin)) -> User
     return current_user
 
 
-def get_read_only_user(current_user: User = Depends(get_current_admin)) -> User:
+async def get_read_only_user(current_user: User = Depends(get_current_admin)) -> User:
     if current_user.role not in ["admin", "read_write", "read"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="No hay permisos"
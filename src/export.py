@@ -0,0 +1,60 @@
+import io
+import os
+import csv
+import json
+from typing import AsyncIterator, Iterator, Sequence
+from sqlalchemy import Select
+import config  # noqa: F401  (carga el .env)
+from sqlalchemy.orm import Session
+
+# Filas por lote leídas del cursor y escritas al cliente
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _render(rows: Sequence, fields: list[str], fmt: str) -> str:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def _header(fields: list[str], fmt: str) -> str:
+    return _render([fields], fields, fmt) if fmt == "csv" else ""
+
+
+# FastAPI cierra la sesión de la dependencia antes de enviar el cuerpo; la sesión
+# se reabre al iterar y se cierra aquí al terminar el stream.
+def stream_rows(
+    db: Session, query: Select, fields: list[str], fmt: str
+) -> Iterator[str]:
+    try:
+        yield _header(fields, fmt)
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            yield _render(rows, fields, fmt)
+    finally:
+        db.close()
+
+
+async def astream_rows(db, query: Select, fields: list[str], fmt: str) -> AsyncIterator[str]:
+    try:
+        yield _header(fields, fmt)
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _render(rows, fields, fmt)
+    finally:
+        await db.close()
+
+
+def stream_users(db, query: Select, fields: list[str], fmt: str):
+    if isinstance(db, Session):
+        return stream_rows(db, query, fields, fmt)
+    return astream_rows(db, query, fields, fmt)
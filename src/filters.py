@@ -0,0 +1,117 @@
+import re
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import and_, column, or_, select, table, text
+from database import IS_SQLITE
+from models.user import User, SEARCH_COLUMNS
+from schemas.user import UserBulkSelection, UserFilters
+from validation import check_date
+
+
+EXACT_FIELDS = ("cp", "phone", "rfc", "curp", "is_active")
+PREFIX_FIELDS = ("name", "email")
+# Edad máxima aceptada en age_min/age_max
+MAX_AGE = 150
+
+user_fts = table("user_fts", column("rowid"))
+
+
+def validate_filters(filters: UserFilters) -> None:
+    errors = []
+    for field in ("date_from", "date_to"):
+        value = getattr(filters, field)
+        message = check_date(value) if value is not None else None
+        if message:
+            errors.append({"field": field, "msg": message})
+    for field in ("age_min", "age_max"):
+        value = getattr(filters, field)
+        if value is not None and value < 0:
+            errors.append({"field": field, "msg": "La edad no puede ser negativa"})
+        elif value is not None and value > MAX_AGE:
+            errors.append({"field": field, "msg": f"La edad no puede ser mayor a {MAX_AGE}"})
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=errors)
+
+
+# Fecha de nacimiento de quien cumple `years` hoy (29 de febrero -> 28); antes del
+# año 1 se usa date.min
+def years_ago(years: int, today: Optional[date] = None) -> date:
+    today = today or date.today()
+    if today.year - years < date.min.year:
+        return date.min
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+
+# "col >= p AND col < p'" usa el índice; startswith corrige colaciones no binarias
+def prefix_condition(col, prefix: str):
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(col >= prefix, col < upper, col.startswith(prefix, autoescape=True))
+
+
+def search_terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q)
+
+
+def search_condition(terms: list[str]):
+    if IS_SQLITE:
+        # Cada término como prefijo entre comillas: sin operadores FTS del usuario
+        match = " ".join(f'"{term}"*' for term in terms)
+        return User.id.in_(
+            select(user_fts.c.rowid).where(text("user_fts MATCH :fts").bindparams(fts=match))
+        )
+    # Postgres: ILIKE respaldado por los índices trigram
+    return and_(
+        *(
+            or_(*(getattr(User, name).ilike(f"%{term}%") for name in SEARCH_COLUMNS))
+            for term in terms
+        )
+    )
+
+
+def user_conditions(filters: Optional[UserFilters]) -> list:
+    if filters is None:
+        return []
+    conditions = []
+    for field in EXACT_FIELDS:
+        value = getattr(filters, field)
+        if value is not None:
+            conditions.append(getattr(User, field) == value)
+    for field in PREFIX_FIELDS:
+        value = getattr(filters, field)
+        if value:
+            conditions.append(prefix_condition(getattr(User, field), value))
+    # Rangos sobre la columna DATE: recorrido por rango del índice ix_user_date
+    if filters.date_from:
+        conditions.append(User.date >= filters.date_from)
+    if filters.date_to:
+        conditions.append(User.date <= filters.date_to)
+    if filters.age_min is not None:
+        conditions.append(User.date <= years_ago(filters.age_min))
+    if filters.age_max is not None:
+        conditions.append(User.date > years_ago(filters.age_max + 1))
+    terms = search_terms(filters.q) if filters.q else []
+    if terms:
+        conditions.append(search_condition(terms))
+    return conditions
+
+
+# Condiciones de una operación en lote; sin ids ni filtros se rechaza para no
+# actualizar o borrar la tabla completa por omisión
+def bulk_conditions(selection: UserBulkSelection) -> list:
+    filters = selection.filters
+    conditions = []
+    if filters is not None:
+        validate_filters(filters)
+        conditions = user_conditions(filters)
+        if filters.cp_in is not None:
+            conditions.append(User.cp.in_(filters.cp_in))
+    if selection.ids is None and not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indica ids o al menos un filtro",
+        )
+    return conditions
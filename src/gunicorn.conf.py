@@ -0,0 +1,22 @@
+# Servidor con varios workers que comparten una sola fase de arranque (Linux/macOS).
+# gunicorn es opcional: pip install gunicorn
+#
+#   cd src && gunicorn -c gunicorn.conf.py main:app
+import os
+import config  # noqa: F401  (carga el .env)
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# La app se importa una vez en el proceso maestro y los workers la heredan al fork
+preload_app = True
+
+
+# Esquema, migraciones y admin inicial antes de crear los workers; en cada worker el
+# lifespan ya no ejecuta DDL
+def on_starting(server):
+    from bootstrap import bootstrap
+    from cache import check_workers
+
+    check_workers(server.cfg.workers)
+    bootstrap()
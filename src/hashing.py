@@ -0,0 +1,124 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import config  # noqa: F401  (carga el .env)
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from metrics import password_hash_duration_seconds
+
+# 0 workers = hilos del proceso actual (útil en desarrollo y pruebas)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# Máximo de operaciones bcrypt en cola o en ejecución antes de responder 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], default="bcrypt", deprecated="auto")
+
+
+# Funciones de nivel de módulo para que el pool de procesos pueda serializarlas
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    # executor: pool propio en lugar del que se crea al primer uso (p. ej. en pruebas)
+    def __init__(self, workers: int, max_pending: int, executor: Executor | None = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = executor
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.workers > 0:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            thread_name_prefix="password-hash"
+                        )
+        return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servicio saturado, intenta de nuevo más tarde",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _run(self, fn, *args):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._release()
+
+    async def hash(self, password: str) -> str:
+        with password_hash_duration_seconds.time(operation="hash"):
+            return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        with password_hash_duration_seconds.time(operation="verify"):
+            return await self._run(_verify, plain_password, hashed_password)
+
+    # Cada contraseña ocupa su lugar en la cola, y en el pool nunca hay más de una por
+    # worker de la misma carga: un login que llega a mitad de una importación espera a
+    # lo sumo una ronda, no la importación completa. Si la cola se llena, 503
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        step = max(self.workers, 1)
+        hashed: list[str] = []
+        with password_hash_duration_seconds.time(operation="hash_many"):
+            for start in range(0, len(passwords), step):
+                batch = passwords[start:start + step]
+                hashed += await asyncio.gather(
+                    *(self._run(_hash, password) for password in batch)
+                )
+        return hashed
+
+    # Un pool de procesos no sobrevive al fork: el worker crea el suyo al primer uso
+    def reset_after_fork(self) -> None:
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=hasher.reset_after_fork)
+
+
+async def hash_password(password: str) -> str:
+    return await hasher.hash(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hasher.verify(plain_password, hashed_password)
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    return await hasher.hash_many(passwords)
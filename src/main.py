@@ -1,27 +1,60 @@
 import os
-from dotenv import load_dotenv
-from fastapi import FastAPI
+import math
+import asyncio
+import config  # noqa: F401  (carga el .env)
+from fastapi import FastAPI, Response
 
 from routes import user, admin
-from database import create_db_and_tables, get_db
-from utils import create_admin_user
+import database
+from database import engine
+from bootstrap import bootstrap
+from hashing import hasher
+from cache import user_cache, check_workers, worker_count
+from dependencies import token_cache, admin_cache
+from metrics import (
+    METRICS_ENABLED,
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    registry,
+    instrument_engine,
+    cache_hits,
+    cache_misses,
+    password_hash_pending,
+    replica_healthy,
+    replica_lag_seconds,
+)
+import profiling
+from stats import USER_STATS_RECONCILE_INTERVAL, reconcile_periodically
+from replicas import DATABASE_REPLICA_CHECK_INTERVAL, check_periodically, read_replicas
+from changes import USER_CHANGES_COMPACT_INTERVAL, compact_periodically
 from contextlib import asynccontextmanager
 
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
 
-load_dotenv()
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tasks = []
+    # También sin gunicorn (uvicorn --workers): memory con varios workers no arranca
+    check_workers(worker_count())
     try:
-        create_db_and_tables()
-        db = next(get_db())
-        create_admin_user(db)
+        # Sin DDL si la base ya está al día (p. ej. preparada con python bootstrap.py)
+        # En un hilo, como toda la E/S de base: el event loop sigue atendiendo señales
+        await asyncio.to_thread(bootstrap, engine)
+        if USER_STATS_RECONCILE_INTERVAL > 0:
+            tasks.append(asyncio.create_task(reconcile_periodically()))
+        if read_replicas and DATABASE_REPLICA_CHECK_INTERVAL > 0:
+            # Las réplicas atrasadas quedan fuera antes de la primera solicitud
+            await asyncio.to_thread(read_replicas.check, engine)
+            tasks.append(asyncio.create_task(check_periodically()))
+        if USER_CHANGES_COMPACT_INTERVAL > 0:
+            tasks.append(asyncio.create_task(compact_periodically()))
         yield
     finally:
-        pass
+        for task in tasks:
+            task.cancel()
+        hasher.shutdown()
 
 app = FastAPI(
     title=os.getenv("APP_TITLE"),
@@ -43,6 +76,40 @@ app.middleware(
 # )
 
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    if database.DATABASE_ASYNC:
+        instrument_engine(database.async_engine.sync_engine)
+
+    @registry.collector
+    def collect_runtime_stats() -> None:
+        caches = {"user": user_cache, "token": token_cache, "admin": admin_cache}
+        for name, cache in caches.items():
+            stats = cache.stats()
+            cache_hits.set(stats["hits"], cache=name)
+            cache_misses.set(stats["misses"], cache=name)
+        password_hash_pending.set(hasher.pending)
+        for replica in read_replicas.replicas:
+            replica_healthy.set(int(replica.healthy), replica=replica.name)
+            if replica.lag is not None and math.isfinite(replica.lag):
+                replica_lag_seconds.set(replica.lag, replica=replica.name)
+
+    # Formato de texto de Prometheus
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+# Perfilado bajo demanda (header X-Profile de un admin o muestreo); apagado no se instala
+if profiling.PROFILING_ENABLED:
+    profiling.check_engine()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    profiling.instrument_engine(engine)
+    if database.DATABASE_ASYNC:
+        profiling.instrument_engine(database.async_engine.sync_engine)
+
+
 app.include_router(admin.router, prefix="/admin", tags=["admins"])
 app.include_router(user.router, prefix="/users", tags=["users"])
 
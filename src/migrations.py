@@ -0,0 +1,300 @@
+import re
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, insert, inspect, select, text
+)
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from database import Base
+from models.user import (
+    User,
+    user_stats,
+    user_changes,
+    SQLITE_SEARCH_DDL,
+    POSTGRES_SEARCH_DDL,
+    SQLITE_STATS_DDL,
+    POSTGRES_STATS_DDL,
+    SQLITE_CHANGES_DDL,
+    POSTGRES_CHANGES_DDL,
+)
+from crud.user import reconcile_user_stats
+from replicas import replica_heartbeat
+from validation import check_date
+
+logger = logging.getLogger(__name__)
+
+# Llave del candado consultivo de Postgres que serializa el arranque entre workers
+BOOTSTRAP_LOCK_KEY = 7_240_523
+
+# Registro de migraciones aplicadas; create_all crea el esquema actual y las
+# migraciones solo completan bases creadas con versiones anteriores
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# Fechas de user que no existen en el calendario, apartadas al convertir la columna a
+# DATE (migración 3) para corregirlas a mano en lugar de perderlas
+user_invalid_dates = Table(
+    "user_invalid_dates",
+    Base.metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("date", String, nullable=False),
+)
+
+
+# Candado del arranque y las migraciones, dentro de la transacción de conn: el primer
+# worker prepara la base y los demás esperan (SQLite: según busy_timeout)
+def lock_schema(conn: Connection) -> None:
+    if conn.dialect.name == "sqlite":
+        # Toma el candado de escritura antes de leer
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": BOOTSTRAP_LOCK_KEY}
+        )
+
+
+# Confirma un lote de una migración larga y vuelve a tomar el candado, así la tabla no
+# queda bloqueada durante toda la migración. Devuelve False si mientras tanto otro
+# worker terminó la migración en curso
+def commit_batch(conn: Connection) -> bool:
+    conn.commit()
+    lock_schema(conn)
+    return conn.info.get("migration") not in applied_versions(conn)
+
+
+def quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def column_names(conn: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def add_user_version_columns(conn: Connection) -> None:
+    columns = column_names(conn, "user")
+    user = quote(conn, "user")
+    if "version" not in columns:
+        conn.execute(
+            text(f"ALTER TABLE {user} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        )
+    if "updated_at" not in columns:
+        conn.execute(text(f"ALTER TABLE {user} ADD COLUMN updated_at TIMESTAMP"))
+        conn.execute(
+            text(f"UPDATE {user} SET updated_at = :now WHERE updated_at IS NULL"),
+            {"now": datetime.now(timezone.utc)},
+        )
+
+
+# Búsqueda de texto (FTS5 en SQLite, trigram en Postgres)
+def add_user_search(conn: Connection) -> None:
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            conn.execute(text(statement))
+        # Indexa las filas existentes desde la tabla de contenido
+        conn.execute(text("INSERT INTO user_fts(user_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            conn.execute(text(statement))
+
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+# User.date pasa de texto DD-MM-YYYY a DATE; el índice ix_user_date queda ordenado.
+# Los valores se reescriben como texto ISO por lotes (cada uno en su transacción) y las
+# fechas inválidas pasan a user_invalid_dates; en Postgres el cambio de tipo final ya
+# no puede fallar
+def convert_user_date(conn: Connection, batch_size: int = 1000) -> None:
+    user = quote(conn, "user")
+    # Índice de expresión de la migración 2, innecesario con la columna tipada
+    conn.execute(text("DROP INDEX IF EXISTS ix_user_date_key"))
+    user_invalid_dates.create(conn, checkfirst=True)
+    invalid = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                f"SELECT id, date FROM {user} WHERE id > :last_id "
+                "AND date IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": batch_size},
+        ).all()
+        if not rows:
+            break
+        updates, rejected = [], []
+        for row_id, value in rows:
+            iso = ISO_DATE.match(value) is not None
+            day_first = f"{value[8:]}-{value[5:7]}-{value[:4]}" if iso else value
+            if check_date(day_first):
+                rejected.append({"user_id": row_id, "date": value})
+                updates.append({"id": row_id, "date": None})
+            elif not iso:
+                updates.append(
+                    {"id": row_id, "date": f"{value[6:]}-{value[3:5]}-{value[:2]}"}
+                )
+        if rejected:
+            conn.execute(insert(user_invalid_dates), rejected)
+            invalid += len(rejected)
+        if updates:
+            conn.execute(text(f"UPDATE {user} SET date = :date WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+        if not commit_batch(conn):
+            return
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(f"ALTER TABLE {user} ALTER COLUMN date TYPE DATE USING date::date")
+        )
+    if invalid:
+        logger.warning(
+            "%s fechas inválidas en user quedaron nulas; los valores originales "
+            "están en user_invalid_dates",
+            invalid,
+        )
+
+
+# Auditoría de índices: fuera los redundantes (id ya es la llave primaria), el de
+# dirección (texto libre) y el de CP, cubierto por el compuesto (cp, date)
+DROPPED_USER_INDEXES = ("ix_user_id", "ix_user_address", "ix_user_cp")
+
+
+def audit_user_indexes(conn: Connection) -> None:
+    for name in DROPPED_USER_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {quote(conn, name)}"))
+    for index in User.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# Contadores de GET /users/stats: tabla, triggers y primer conteo de las filas existentes
+def add_user_stats(conn: Connection) -> None:
+    user_stats.create(conn, checkfirst=True)
+    statements = {"sqlite": SQLITE_STATS_DDL, "postgresql": POSTGRES_STATS_DDL}
+    for statement in statements.get(conn.dialect.name, []):
+        conn.execute(text(statement))
+    # La sesión se une a la transacción de la migración (su commit no la cierra)
+    with Session(bind=conn) as db:
+        reconcile_user_stats(db)
+
+
+# Latido para medir el retraso de las réplicas de lectura
+def add_replica_heartbeat(conn: Connection) -> None:
+    replica_heartbeat.create(conn, checkfirst=True)
+
+
+# Registro de cambios de GET /users/changes; empieza vacío (sin historial previo)
+def add_user_changes(conn: Connection) -> None:
+    user_changes.create(conn, checkfirst=True)
+    statements = {"sqlite": SQLITE_CHANGES_DDL, "postgresql": POSTGRES_CHANGES_DDL}
+    for statement in statements.get(conn.dialect.name, []):
+        conn.execute(text(statement))
+
+
+# SQLite: user.id pasa a AUTOINCREMENT para que un id eliminado no se reutilice y un
+# cambio viejo de GET /users/changes no apunte a otra persona. SQLite no puede cambiarlo
+# con ALTER TABLE: se reconstruye la tabla con los mismos ids y se recrean índices y
+# triggers. En Postgres los ids ya salen de una secuencia que no retrocede
+def add_user_autoincrement(conn: Connection) -> None:
+    if conn.dialect.name != "sqlite":
+        return
+    user = quote(conn, "user")
+    if "AUTOINCREMENT" in conn.scalar(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'user'")
+    ).upper():
+        return
+    rebuilt = User.__table__.to_metadata(MetaData(), name="user_rebuilt")
+    conn.execute(CreateTable(rebuilt))
+    columns = ", ".join(
+        quote(conn, column.name)
+        for column in User.__table__.columns
+        if column.name in column_names(conn, "user")
+    )
+    conn.execute(text(f"INSERT INTO user_rebuilt ({columns}) SELECT {columns} FROM {user}"))
+    # Se llevan también los índices y triggers de la tabla anterior
+    conn.execute(text(f"DROP TABLE {user}"))
+    conn.execute(text(f"ALTER TABLE user_rebuilt RENAME TO {user}"))
+    for index in User.__table__.indexes:
+        index.create(conn)
+    for statement in SQLITE_SEARCH_DDL + SQLITE_STATS_DDL + SQLITE_CHANGES_DDL:
+        conn.execute(text(statement))
+    # El siguiente id queda por encima de todo id usado, aun de usuarios ya eliminados
+    highest = max(
+        conn.scalar(select(func.max(user_changes.c.user_id))) or 0,
+        conn.scalar(text(f"SELECT max(id) FROM {user}")) or 0,
+    )
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name IN ('user', 'user_rebuilt')"))
+    conn.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('user', :seq)"),
+        {"seq": highest},
+    )
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "user_version_updated_at", add_user_version_columns),
+    (2, "user_search", add_user_search),
+    (3, "user_date_type", convert_user_date),
+    (4, "user_index_audit", audit_user_indexes),
+    (5, "user_stats", add_user_stats),
+    (6, "replica_heartbeat", add_replica_heartbeat),
+    (7, "user_changes", add_user_changes),
+    (8, "user_autoincrement", add_user_autoincrement),
+]
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    if not inspect(conn).has_table(schema_version.name):
+        return set()
+    return set(conn.scalars(select(schema_version.c.version)))
+
+
+def record_migration(conn: Connection, version: int, name: str) -> None:
+    conn.execute(
+        schema_version.insert().values(
+            version=version, name=name, applied_at=datetime.now(timezone.utc)
+        )
+    )
+
+
+# Acepta un engine (conexión y candado propios) o una conexión que ya tiene el
+# candado (bootstrap)
+def run_migrations(bind: Engine | Connection) -> list[int]:
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            lock_schema(conn)
+            applied_now = run_migrations(conn)
+            conn.commit()
+            return applied_now
+    applied_now = []
+    schema_version.create(bind, checkfirst=True)
+    for version, name, migrate in MIGRATIONS:
+        # Se relee en cada paso: una migración por lotes suelta el candado entre lotes
+        # y otro worker pudo avanzar mientras tanto
+        if version in applied_versions(bind):
+            continue
+        bind.info["migration"] = version
+        try:
+            migrate(bind)
+        finally:
+            bind.info.pop("migration", None)
+        if version not in applied_versions(bind):
+            record_migration(bind, version, name)
+            applied_now.append(version)
+    return applied_now
+
+
+# Una base recién creada con create_all ya tiene el esquema actual: las migraciones
+# se registran como aplicadas sin ejecutarlas
+def stamp_migrations(conn: Connection) -> None:
+    schema_version.create(conn, checkfirst=True)
+    applied = applied_versions(conn)
+    for version, name, _ in MIGRATIONS:
+        if version not in applied:
+            record_migration(conn, version, name)
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean
 
-from database import Base, engine
+from database import Base
 
 
 class Admin(Base):
@@ -12,5 +12,3 @@ class Admin(Base):
     hashed_password = Column(String)
     role = Column(String)
     is_active = Column(Boolean, default=True)
-
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -1,24 +1,219 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from datetime import date, datetime, timezone
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Boolean, Date, DateTime, DDL, Float, Index,
+    Table, event,
+)
+from sqlalchemy.types import TypeDecorator
 
-from database import Base, engine
+from database import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# DATE en la base (ordenable e indexable por rango); DD-MM-YYYY hacia la API
+class DayMonthYear(TypeDecorator):
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            if not value:
+                return None
+            return date(int(value[6:]), int(value[3:5]), int(value[:2]))
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return f"{value.day:02d}-{value.month:02d}-{value.year:04d}"
 
 
 class User(Base):
     __tablename__ = "user"
     
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Solo índices con una consulta detrás: cada uno se mantiene en cada escritura
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     rfc = Column(String, unique=True, index=True)
     curp = Column(String, unique=True, index=True)
-    cp = Column(String, index=True)
+    cp = Column(String)
     phone = Column(String, index=True)
-    address = Column(String, index=True)
-    date = Column(String, index=True)
+    # La búsqueda por dirección usa el índice de texto (user_fts / trigram)
+    address = Column(String)
+    date = Column(DayMonthYear, index=True)
+    # Versión de fila para ETag y concurrencia optimista
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+    # Filtro por CP solo o combinado con rango/orden por fecha. AUTOINCREMENT: SQLite
+    # no reutiliza el id del último usuario eliminado (el registro de cambios lo conserva)
+    __table_args__ = (
+        Index("ix_user_cp_date", "cp", "date"),
+        {"sqlite_autoincrement": True},
+    )
+    __mapper_args__ = {"version_id_col": version}
     
 
+# Búsqueda de texto: FTS5 con contenido externo en SQLite, sincronizado por triggers
+SEARCH_COLUMNS = ("name", "email", "address")
+
+_columns = ", ".join(SEARCH_COLUMNS)
+_new = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+_old = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5({_columns}, "
+    f"content='user', content_rowid='id')",
+    f'CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON "user" BEGIN '
+    f"INSERT INTO user_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f'CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON "user" BEGIN '
+    f"INSERT INTO user_fts(user_fts, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); END",
+    f'CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF {_columns} ON "user" BEGIN '
+    f"INSERT INTO user_fts(user_fts, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO user_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+]
+
+# En Postgres la búsqueda usa ILIKE respaldado por índices trigram
+POSTGRES_SEARCH_DDL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f'CREATE INDEX IF NOT EXISTS ix_user_{column}_trgm ON "user" '
+    f"USING gin ({column} gin_trgm_ops)"
+    for column in SEARCH_COLUMNS
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        User.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
+event.listen(
+    User.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS user_fts").execute_if(dialect="sqlite"),
+)
+
+
+# Conteos de GET /users/stats mantenidos por triggers en la misma transacción de
+# cada escritura: 'total', 'active' y 'cp:XX' por prefijo de código postal
+CP_PREFIX_LENGTH = 2
+
+user_stats = Table(
+    "user_stats",
+    Base.metadata,
+    Column("name", String, primary_key=True),
+    Column("count", Integer, nullable=False, default=0),
+)
+
+# (nombre del contador, condición) para una fila de user (new/old)
+def _stat_rows(row: str) -> list[tuple[str, str]]:
+    return [
+        ("'total'", "true"),
+        ("'active'", f"{row}.is_active"),
+        (f"'cp:' || substr({row}.cp, 1, {CP_PREFIX_LENGTH})", f"{row}.cp <> ''"),
+    ]
+
+
+def _bump(row: str, delta: int) -> str:
+    return "".join(
+        f"INSERT INTO user_stats (name, count) SELECT {name}, {delta} WHERE {condition} "
+        "ON CONFLICT (name) DO UPDATE SET count = user_stats.count + excluded.count; "
+        for name, condition in _stat_rows(row)
+    )
+
+
+SQLITE_STATS_DDL = [
+    f'CREATE TRIGGER IF NOT EXISTS user_stats_ai AFTER INSERT ON "user" BEGIN '
+    f"{_bump('new', 1)}END",
+    f'CREATE TRIGGER IF NOT EXISTS user_stats_ad AFTER DELETE ON "user" BEGIN '
+    f"{_bump('old', -1)}END",
+    f'CREATE TRIGGER IF NOT EXISTS user_stats_au AFTER UPDATE OF is_active, cp ON "user" '
+    f"BEGIN {_bump('old', -1)}{_bump('new', 1)}END",
+]
+
+POSTGRES_STATS_DDL = [
+    "CREATE OR REPLACE FUNCTION user_stats_track() RETURNS trigger AS $$ BEGIN "
+    f"IF TG_OP <> 'INSERT' THEN {_bump('OLD', -1)}END IF; "
+    f"IF TG_OP <> 'DELETE' THEN {_bump('NEW', 1)}END IF; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "CREATE OR REPLACE TRIGGER user_stats_track "
+    'AFTER INSERT OR DELETE OR UPDATE OF is_active, cp ON "user" '
+    "FOR EACH ROW EXECUTE FUNCTION user_stats_track()",
+]
+
+for statement in SQLITE_STATS_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_STATS_DDL:
+    event.listen(
+        User.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
+
+
+# Registro de cambios (outbox) para GET /users/changes: un trigger agrega una fila por
+# alta, cambio o baja en la misma transacción de la escritura, sea cual sea la ruta
+# (individual, masiva o fuera de la API). seq crece siempre: AUTOINCREMENT evita que
+# SQLite reutilice números tras la compactación
+user_changes = Table(
+    "user_changes",
+    Base.metadata,
+    Column("seq", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("op", String, nullable=False),
+    Column("version", Integer),
+    # Segundos desde epoch; la compactación borra por antigüedad
+    Column("changed_at", Float, nullable=False, index=True),
+    # Transacción que escribió el cambio (solo Postgres; ver POSTGRES_CHANGES_DDL)
+    Column("xid", BigInteger),
+    Index("ix_user_changes_xid_seq", "xid", "seq").ddl_if(dialect="postgresql"),
+    sqlite_autoincrement=True,
+)
+
+_SQLITE_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def _sqlite_change(name: str, operation: str, op: str, row: str) -> str:
+    return (
+        f'CREATE TRIGGER IF NOT EXISTS user_changes_{name} AFTER {operation} ON "user" '
+        "BEGIN INSERT INTO user_changes (user_id, op, version, changed_at) "
+        f"VALUES ({row}.id, '{op}', {row}.version, {_SQLITE_NOW}); END"
+    )
+
+
+SQLITE_CHANGES_DDL = [
+    _sqlite_change("ai", "INSERT", "create", "new"),
+    _sqlite_change("au", "UPDATE", "update", "new"),
+    _sqlite_change("ad", "DELETE", "delete", "old"),
+]
+
+# En Postgres un seq menor puede confirmarse después de uno mayor, así que el orden
+# de seq no sirve de cursor. Cada cambio guarda el xid de su transacción y el registro
+# se lee en orden (xid, seq) entregando solo lo anterior a pg_snapshot_xmin: esas
+# transacciones ya terminaron y ninguna nueva obtiene un xid menor. Las escrituras no
+# se esperan entre sí (ver crud.user.get_user_changes)
+POSTGRES_CHANGES_DDL = [
+    "CREATE OR REPLACE FUNCTION user_changes_track() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO user_changes (user_id, op, version, changed_at, xid) VALUES ("
+    "CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END, "
+    "CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update' "
+    "ELSE 'delete' END, "
+    "CASE TG_OP WHEN 'DELETE' THEN OLD.version ELSE NEW.version END, "
+    "extract(epoch from clock_timestamp()), pg_current_xact_id()::text::bigint); "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "CREATE OR REPLACE TRIGGER user_changes_track "
+    'AFTER INSERT OR UPDATE OR DELETE ON "user" '
+    "FOR EACH ROW EXECUTE FUNCTION user_changes_track()",
+]
 
-Base.metadata.create_all(bind=engine)
+for statement in SQLITE_CHANGES_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_CHANGES_DDL:
+    event.listen(
+        User.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
@@ -0,0 +1,71 @@
+import json
+import base64
+import binascii
+from typing import Any
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from models.user import User
+from validation import check_date
+
+# Claves de orden soportadas por la paginación por cursor (todas indexadas)
+SORT_COLUMNS = {
+    "id": User.id,
+    "name": User.name,
+    "date": User.date,
+}
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Cursor de paginación inválido",
+)
+
+
+def encode_cursor(sort: str, user: User) -> str:
+    data = [sort, getattr(user, sort), user.id]
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# El valor de orden llega del cliente y va directo a la comparación del keyset:
+# debe tener el tipo (y para date el formato DD-MM-YYYY) de la columna; None es válido
+def _valid_sort_value(sort: str, value: Any) -> bool:
+    if sort == "id":
+        return _is_int(value)
+    if value is None:
+        return True
+    if not isinstance(value, str):
+        return False
+    return sort != "date" or check_date(value) is None
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise invalid_cursor_exception
+    if cursor_sort != sort or not _is_int(last_id) or not _valid_sort_value(sort, value):
+        raise invalid_cursor_exception
+    return value, last_id
+
+
+def order_by(sort: str) -> list:
+    if sort == "id":
+        return [User.id]
+    # NULLS FIRST explícito para que SQLite y Postgres ordenen igual
+    return [SORT_COLUMNS[sort].nulls_first(), User.id]
+
+
+# Condición "después de (valor, id)" para el orden (columna NULLS FIRST, id)
+def after(sort: str, value: Any, last_id: int):
+    if sort == "id":
+        return User.id > last_id
+    column = SORT_COLUMNS[sort]
+    if value is None:
+        return or_(and_(column.is_(None), User.id > last_id), column.is_not(None))
+    # El ">=" explícito permite al planificador usar un rango sobre el índice
+    return and_(column >= value, or_(column > value, User.id > last_id))
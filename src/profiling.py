@@ -0,0 +1,226 @@
+import io
+import os
+import time
+import pstats
+import random
+import cProfile
+import itertools
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from inspect import isasyncgenfunction
+from typing import Optional
+import config  # noqa: F401  (carga el .env)
+from fastapi import HTTPException, Request
+from fastapi.concurrency import contextmanager_in_threadpool
+from sqlalchemy import event
+
+# Apagado por defecto: sin middleware ni listeners no hay ningún costo por solicitud
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fracción de solicitudes perfiladas sin que nadie lo pida (0.0 a 1.0)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
+# "cprofile" (biblioteca estándar) o "pyinstrument" (se instala aparte)
+PROFILING_ENGINE = os.getenv("PROFILING_ENGINE", "cprofile")
+PROFILE_HEADER = "x-profile"
+# Funciones mostradas en el reporte de cProfile
+PROFILE_TOP_FUNCTIONS = 40
+
+# Sentencias SQL de la solicitud perfilada en curso (None fuera de un perfil)
+_sql_log: ContextVar[Optional[list]] = ContextVar("profile_sql_log", default=None)
+
+profiles: deque = deque(maxlen=PROFILING_BUFFER_SIZE)
+_ids = itertools.count(1)
+# cProfile y pyinstrument usan un único hook por hilo (dos perfiles anidados fallan):
+# solo un perfil a la vez en el event loop, con cualquiera de los dos
+_profile_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _sql_log.get()
+    if log is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _sql_log.get()
+    if log is not None:
+        elapsed = time.perf_counter() - getattr(context, "_profile_start", time.perf_counter())
+        log.append({"statement": statement, "duration_ms": round(elapsed * 1000, 3)})
+
+
+def instrument_engine(sync_engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Perfilador con la misma interfaz para cProfile y pyinstrument.
+# cProfile solo ve el hilo del event loop: el tiempo dentro de run_db aparece como
+# espera y se detalla en el log SQL; también incluye otras tareas concurrentes
+class _CProfiler:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+
+    def report(self) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return output.getvalue()
+
+
+class _PyInstrumentProfiler:
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        # async_mode: solo cuenta el tiempo de la tarea de esta solicitud
+        self._profile = Profiler(async_mode="enabled")
+
+    def start(self) -> None:
+        self._profile.start()
+
+    def stop(self) -> None:
+        self._profile.stop()
+
+    def report(self) -> str:
+        return self._profile.output_text()
+
+
+# Al arrancar: pyinstrument se instala aparte y sin él fallaría cada solicitud perfilada
+def check_engine() -> None:
+    if PROFILING_ENGINE not in ("cprofile", "pyinstrument"):
+        raise RuntimeError(f"PROFILING_ENGINE desconocido: {PROFILING_ENGINE}")
+    if PROFILING_ENGINE == "pyinstrument":
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(
+                "PROFILING_ENGINE=pyinstrument requiere el paquete pyinstrument"
+            ) from e
+
+
+@contextmanager
+def _profiler():
+    # Con otro perfil activo esta solicitud no se perfila
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    try:
+        if PROFILING_ENGINE == "pyinstrument":
+            yield _PyInstrumentProfiler()
+        else:
+            yield _CProfiler()
+    finally:
+        _profile_lock.release()
+
+
+# El header solo cuenta si el token es de un admin, con las mismas dependencias de las rutas
+async def is_admin_request(request: Request) -> bool:
+    from database import get_session
+    from dependencies import oauth2_scheme, get_current_admin, get_admin_user
+
+    provider = request.app.dependency_overrides.get(get_session, get_session)
+    try:
+        token = await oauth2_scheme(request)
+        # Una sola sesión de la primaria también para la búsqueda del admin; la sesión
+        # síncrona se abre y se cierra en el threadpool, como en las dependencias
+        if isasyncgenfunction(provider):
+            async with asynccontextmanager(provider)() as db:
+                admin = await get_current_admin(token, db, db)
+        else:
+            async with contextmanager_in_threadpool(contextmanager(provider)()) as db:
+                admin = await get_current_admin(token, db, db)
+        await get_admin_user(admin)
+    except HTTPException:
+        return False
+    return True
+
+
+def get_profiles() -> list[dict]:
+    return [
+        {key: value for key, value in entry.items() if key not in ("profile", "sql")}
+        | {"sql_statements": len(entry["sql"])}
+        for entry in reversed(profiles)
+    ]
+
+
+def get_profile(profile_id: int) -> Optional[dict]:
+    for entry in profiles:
+        if entry["id"] == profile_id:
+            return entry
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def _trigger(self, scope) -> Optional[str]:
+        request = Request(scope)
+        if PROFILE_HEADER in request.headers and await is_admin_request(request):
+            return "header"
+        if PROFILING_SAMPLE_RATE and random.random() < PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = await self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        with _profiler() as profiler:
+            if profiler is None:
+                await self.app(scope, receive, send)
+                return
+            await self._profile(scope, receive, send, trigger, profiler)
+
+    async def _profile(self, scope, receive, send, trigger, profiler) -> None:
+        profile_id = next(_ids)
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", str(profile_id).encode()),
+                ]
+            await send(message)
+
+        sql: list = []
+        token = _sql_log.set(sql)
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            elapsed = time.perf_counter() - start
+            _sql_log.reset(token)
+            profiles.append(
+                {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status_code,
+                    "trigger": trigger,
+                    "started_at": started_at.isoformat(),
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "sql": sql,
+                    "profile": profiler.report(),
+                }
+            )
@@ -0,0 +1,227 @@
+import os
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+import config  # noqa: F401  (carga el .env)
+
+from cache import TTLCache
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" (por proceso) o "redis" (compartido entre workers; usa REDIS_URL)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+# Intentos permitidos de golpe y recarga por minuto, por IP y por usuario
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "30"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "10"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "10"))
+# Bloqueo tras N fallos seguidos: base * 2^(fallos - N) segundos, hasta el máximo
+LOGIN_LOCKOUT_THRESHOLD = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", "5"))
+LOGIN_LOCKOUT_BASE = float(os.getenv("LOGIN_LOCKOUT_BASE", "30"))
+LOGIN_LOCKOUT_MAX = float(os.getenv("LOGIN_LOCKOUT_MAX", "900"))
+# Los fallos se olvidan tras este tiempo sin nuevos fallos
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "900"))
+# Llaves (IP/usuario) en memoria; las más antiguas se descartan
+LOGIN_RATE_LIMIT_SIZE = int(os.getenv("LOGIN_RATE_LIMIT_SIZE", "100000"))
+
+
+@dataclass(frozen=True)
+class Bucket:
+    capacity: int
+    per_second: float
+
+    # Segundos para llenarse desde vacío: después la entrada ya no hace falta
+    @property
+    def ttl(self) -> float:
+        return self.capacity / self.per_second
+
+
+@dataclass(frozen=True)
+class Lockout:
+    threshold: int
+    base: float
+    maximum: float
+    window: float
+
+    def duration(self, failures: int) -> float:
+        if failures < self.threshold:
+            return 0.0
+        return min(self.base * 2 ** (failures - self.threshold), self.maximum)
+
+
+# Almacén en memoria del proceso: TTLCache acotada, cada entrada expira sola
+class MemoryStore:
+    def __init__(self, maxsize: int):
+        self._buckets = TTLCache(maxsize, float("inf"))
+        self._failures = TTLCache(maxsize, float("inf"))
+        self._locks = TTLCache(maxsize, float("inf"))
+
+    # Toma un intento del bucket; devuelve 0 si se permite o los segundos a esperar
+    async def take(self, key: str, bucket: Bucket, now: float) -> float:
+        tokens, last = self._buckets.get(key, (bucket.capacity, now))
+        tokens = min(bucket.capacity, tokens + (now - last) * bucket.per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / bucket.per_second
+        self._buckets.set(key, (tokens, now), bucket.ttl)
+        return retry_after
+
+    async def locked_for(self, key: str, now: float) -> float:
+        return max(self._locks.get(key, now) - now, 0.0)
+
+    # Registra un fallo; devuelve la duración del bloqueo aplicado (0 si no hay)
+    async def fail(self, key: str, lockout: Lockout, now: float) -> float:
+        failures = self._failures.get(key, 0) + 1
+        self._failures.set(key, failures, lockout.window)
+        duration = lockout.duration(failures)
+        if duration:
+            self._locks.set(key, now + duration, duration)
+        return duration
+
+    async def reset(self, key: str) -> None:
+        self._failures.delete(key)
+        self._locks.delete(key)
+
+    def __len__(self) -> int:
+        return len(self._buckets) + len(self._failures) + len(self._locks)
+
+
+# Bucket atómico en Redis: recarga, consumo y expiración en un solo script
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or capacity)
+local last = tonumber(redis.call('HGET', KEYS[1], 'last') or now)
+tokens = math.min(capacity, tokens + math.max(now - last, 0) * rate)
+local retry = 0
+if tokens >= 1 then tokens = tokens - 1 else retry = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return tostring(retry)
+"""
+
+
+# Almacén compartido entre workers (redis.asyncio o un cliente compatible)
+class RedisStore:
+    def __init__(self, client, prefix: str = "login:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "login:") -> "RedisStore":
+        import redis.asyncio
+
+        return cls(redis.asyncio.Redis.from_url(url), prefix)
+
+    async def take(self, key: str, bucket: Bucket, now: float) -> float:
+        retry_after = await self.client.eval(
+            TOKEN_BUCKET_SCRIPT,
+            1,
+            f"{self.prefix}bucket:{key}",
+            bucket.capacity,
+            bucket.per_second,
+            now,
+        )
+        return float(retry_after)
+
+    async def locked_for(self, key: str, now: float) -> float:
+        remaining = await self.client.pttl(f"{self.prefix}lock:{key}")
+        return remaining / 1000 if remaining > 0 else 0.0
+
+    async def fail(self, key: str, lockout: Lockout, now: float) -> float:
+        failures_key = f"{self.prefix}fail:{key}"
+        failures = await self.client.incr(failures_key)
+        await self.client.expire(failures_key, math.ceil(lockout.window))
+        duration = lockout.duration(failures)
+        if duration:
+            await self.client.set(
+                f"{self.prefix}lock:{key}", 1, px=math.ceil(duration * 1000)
+            )
+        return duration
+
+    async def reset(self, key: str) -> None:
+        await self.client.delete(f"{self.prefix}fail:{key}", f"{self.prefix}lock:{key}")
+
+
+def create_store(kind: str, maxsize: int):
+    if kind == "memory":
+        return MemoryStore(maxsize)
+    if kind == "redis":
+        return RedisStore.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Backend de límite de intentos desconocido: {kind}")
+
+
+# Límite de intentos de /admin/login: se consulta antes de buscar al admin y de bcrypt.
+# Cada intento consume del bucket de su IP y del de su usuario (el único límite global
+# por usuario). Los fallos seguidos bloquean el par IP+usuario con una duración que se
+# duplica en cada fallo adicional: nadie puede dejar fuera al admin real fallando a
+# propósito desde otra IP, y rotar cuentas desde una IP lo frena el bucket de la IP
+class LoginRateLimiter:
+    def __init__(
+        self,
+        store,
+        ip_bucket: Bucket,
+        user_bucket: Bucket,
+        lockout: Lockout,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.ip_bucket = ip_bucket
+        self.user_bucket = user_bucket
+        self.lockout = lockout
+        self.enabled = enabled
+        self.clock = clock
+
+    # (IP, usuario, par IP+usuario)
+    @staticmethod
+    def _keys(ip: str, username: str) -> tuple[str, str, str]:
+        username = username.strip().lower()
+        return f"ip:{ip}", f"user:{username}", f"pair:{ip}:{username}"
+
+    # Devuelve (motivo, segundos a esperar) si el intento se rechaza
+    async def check(self, ip: str, username: str) -> Optional[tuple[str, float]]:
+        if not self.enabled:
+            return None
+        now = self.clock()
+        ip_key, user_key, pair_key = self._keys(ip, username)
+        # Un bloqueo vigente no consume intentos del bucket
+        locked = await self.store.locked_for(pair_key, now)
+        if locked:
+            return "lockout", locked
+        retry_after = await self.store.take(ip_key, self.ip_bucket, now)
+        if retry_after:
+            return "ip", retry_after
+        retry_after = await self.store.take(user_key, self.user_bucket, now)
+        if retry_after:
+            return "username", retry_after
+        return None
+
+    async def failure(self, ip: str, username: str) -> None:
+        if not self.enabled:
+            return
+        await self.store.fail(self._keys(ip, username)[2], self.lockout, self.clock())
+
+    # Solo reinicia el par: un login correcto con una cuenta propia no devuelve a la IP
+    # intentos contra otras cuentas
+    async def success(self, ip: str, username: str) -> None:
+        if not self.enabled:
+            return
+        await self.store.reset(self._keys(ip, username)[2])
+
+
+login_limiter = LoginRateLimiter(
+    create_store(LOGIN_RATE_LIMIT_BACKEND, LOGIN_RATE_LIMIT_SIZE),
+    Bucket(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60),
+    Bucket(LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE / 60),
+    Lockout(
+        LOGIN_LOCKOUT_THRESHOLD,
+        LOGIN_LOCKOUT_BASE,
+        LOGIN_LOCKOUT_MAX,
+        LOGIN_FAILURE_WINDOW,
+    ),
+    enabled=LOGIN_RATE_LIMIT_ENABLED,
+)
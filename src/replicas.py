@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import config  # noqa: F401  (carga el .env)
+from fastapi import Depends
+from sqlalchemy import (
+    Column, Float, Integer, Table, create_engine, event, select, update
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+import database
+from database import Base, configure_engine, engine_options, get_async_db, get_db
+
+# URLs completas de las réplicas de lectura, separadas por comas
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# "round_robin" o "least_busy" (la réplica con menos conexiones en uso)
+DATABASE_REPLICA_STRATEGY = os.getenv("DATABASE_REPLICA_STRATEGY", "round_robin")
+# Segundos de retraso tolerados antes de sacar una réplica de la rotación
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))
+# Segundos entre revisiones de salud; 0 las desactiva (todas las réplicas se usan)
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+# Latido escrito en la primaria: en la réplica su antigüedad es el retraso de la copia
+replica_heartbeat = Table(
+    "replica_heartbeat",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("at", Float, nullable=False),
+)
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: Engine
+    # Engine que usan las sesiones: el síncrono o el sync_engine del async
+    session_bind: Engine
+    healthy: bool = True
+    lag: Optional[float] = None
+    in_flight: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        # Conexiones en uso, para least_busy
+        event.listen(self.session_bind, "checkout", self._checkout)
+        event.listen(self.session_bind, "checkin", self._checkin)
+
+    def _checkout(self, *args) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def _checkin(self, *args) -> None:
+        with self._lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        replicas: list[Replica],
+        strategy: str = "round_robin",
+        max_lag: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Estrategia de réplicas desconocida: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.clock = clock
+        self._turn = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    # Réplica para una sesión de lectura; None si ninguna está sana (se lee la primaria)
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start = next(self._turn) % len(healthy)
+        rotation = healthy[start:] + healthy[:start]
+        if self.strategy == "least_busy":
+            return min(rotation, key=lambda replica: replica.in_flight)
+        return rotation[0]
+
+    # Escribe el latido en la primaria y mide su antigüedad en cada réplica
+    def check(self, primary: Engine) -> dict[str, Optional[float]]:
+        now = self.clock()
+        with primary.begin() as conn:
+            beat = update(replica_heartbeat).where(replica_heartbeat.c.id == 1)
+            updated = conn.execute(beat.values(at=now))
+            if not updated.rowcount:
+                conn.execute(replica_heartbeat.insert().values(id=1, at=now))
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    at = conn.scalar(
+                        select(replica_heartbeat.c.at).where(replica_heartbeat.c.id == 1)
+                    )
+                replica.lag = max(now - at, 0.0) if at is not None else float("inf")
+            except Exception:
+                logger.warning("Réplica %s inaccesible", replica.name, exc_info=True)
+                replica.lag = None
+            healthy = replica.lag is not None and replica.lag <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Réplica %s %s (retraso: %s s)",
+                    replica.name,
+                    "vuelve a la rotación" if healthy else "fuera de la rotación",
+                    replica.lag,
+                )
+            replica.healthy = healthy
+        return {replica.name: replica.lag for replica in self.replicas}
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+            if replica.session_bind is not replica.engine:
+                replica.session_bind.dispose(close=close)
+
+
+def create_replica(name: str, url: str, is_async: bool = False) -> Replica:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, **engine_options())
+    configure_engine(engine)
+    session_bind = engine
+    if is_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        async_engine = create_async_engine(
+            database.get_async_database_url(url), **engine_options(True)
+        )
+        configure_engine(async_engine.sync_engine)
+        session_bind = async_engine.sync_engine
+    return Replica(name, engine, session_bind)
+
+
+# Sesión de lectura: las consultas van a una réplica (la misma durante toda la
+# sesión) y, en cuanto la sesión escribe, todo lo que sigue va a la primaria para
+# leer lo recién escrito
+class ReadSession(Session):
+    def __init__(self, *args, replicas: ReplicaSet, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.replica: Optional[Replica] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["primary"] = True
+        if not self.info.get("primary"):
+            if self.replica is None:
+                self.replica = self.replicas.choose()
+            if self.replica is not None:
+                return self.replica.session_bind
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+# True si la sesión leyó de una réplica: lo leído puede ir atrasado y no debe guardarse
+# en cachés que sobreviven al retraso de la réplica
+def used_replica(db) -> bool:
+    session = getattr(db, "sync_session", db)
+    return (
+        isinstance(session, ReadSession)
+        and session.replica is not None
+        and not session.info.get("primary")
+    )
+
+
+read_replicas = ReplicaSet(
+    [
+        create_replica(f"replica{i}", url, database.DATABASE_ASYNC)
+        for i, url in enumerate(DATABASE_REPLICA_URLS)
+    ],
+    DATABASE_REPLICA_STRATEGY,
+    DATABASE_REPLICA_MAX_LAG,
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: read_replicas.dispose(close=False))
+
+
+# Dependencias de las rutas de solo lectura. Sin réplicas es la sesión de siempre;
+# con réplicas, una ReadSession cuya primaria es la de get_db (las sesiones no toman
+# conexión hasta la primera consulta, así que la primaria no cuesta nada si no se usa)
+def get_read_db(db: Session = Depends(get_db)):
+    if not read_replicas:
+        yield db
+        return
+    read_db = ReadSession(bind=db.get_bind(), replicas=read_replicas, autoflush=False)
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
+async def get_async_read_db(db=Depends(get_async_db)):
+    if not read_replicas:
+        yield db
+        return
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with AsyncSession(
+        bind=db.bind,
+        sync_session_class=ReadSession,
+        replicas=read_replicas,
+        autoflush=False,
+        expire_on_commit=False,
+    ) as read_db:
+        yield read_db
+
+
+get_read_session = get_async_read_db if database.DATABASE_ASYNC else get_read_db
+
+
+# Tarea de fondo del lifespan: saca de la rotación las réplicas atrasadas o caídas
+async def check_periodically(
+    replicas: ReplicaSet = read_replicas,
+    interval: float = DATABASE_REPLICA_CHECK_INTERVAL,
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(replicas.check, database.engine)
+        except Exception:
+            logger.exception("No se pudo revisar el retraso de las réplicas")
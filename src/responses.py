@@ -0,0 +1,18 @@
+from typing import Iterable, Sequence
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+# orjson es opcional: sin él los listados usan json de la biblioteca estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FastJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+
+# Filas de columnas a dicts con las claves del esquema de salida, sin construir un
+# modelo Pydantic por fila. Solo para esquemas que las columnas ya satisfacen (mismos
+# nombres, tipos JSON nativos y datos validados al escribir); las columnas extra al
+# final de la fila (versión, updated_at) se descartan
+def rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str]) -> list[dict]:
+    return [dict(zip(fields, row)) for row in rows]
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from models.admin import Admin
-from schemas.admin import AdminCreate, AdminOut, AdminUpdate
-from dependencies import get_db, get_admin_user, create_access_token
-from utils import get_password_hash, verify_password
+from schemas.admin import AdminCreate, AdminOut, AdminUpdate, ADMIN_OUT_FIELDS
+from crud import admin as crud
+from database import unique_violation
+from dependencies import (
+    get_session,
+    get_read_session,
+    run_db,
+    get_admin_user,
+    create_access_token,
+    invalidate_admin_cache,
+)
+from hashing import hash_password, verify_password
+from profiling import get_profiles, get_profile
+from responses import FastJSONResponse, rows_to_dicts
+from ratelimit import login_limiter
+from metrics import login_rate_limited_total
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 router = APIRouter()
@@ -14,86 +28,117 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 # Obtener todos los admins (solo accesible para admin)
-@router.get("/", response_model=list[AdminOut])
-def get_admins(
-    db: Session = Depends(get_db), current_admin: Admin = Depends(get_admin_user)
+@router.get("/", responses={200: {"model": list[AdminOut]}})
+async def get_admins(
+    db: Session = Depends(get_read_session),
+    current_admin: Admin = Depends(get_admin_user),
 ):
-    admins = db.query(Admin).all()
-    return admins
+    # Los correos ya se validaron como EmailStr al escribir: sin AdminOut por fila
+    admins = await run_db(db, crud.get_admin_rows)
+    return FastJSONResponse(rows_to_dicts(admins, ADMIN_OUT_FIELDS))
 
 
 # Actualizar un admin (solo accesible para admin)
 @router.put("/{admin_id}", response_model=AdminOut)
-def update_admin(
+async def update_admin(
     admin_id: int,
     admin_update: AdminUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_admin_user),
 ):
-    db_admin = db.query(Admin).filter(Admin.id == admin_id).first()
-    if not db_admin:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="Admin no encontrado"
+    # Un solo UPDATE ... RETURNING; el email repetido lo detecta la restricción única
+    try:
+        db_admin, previous_email = await run_db(
+            db, crud.update_admin, admin_id, admin_update
         )
-
-    # Check if the new email already exists
-    if admin_update.email and admin_update.email != db_admin.email:
-        existing_admin = db.query(Admin).filter(Admin.email == admin_update.email).first()
-        if existing_admin:
+    except IntegrityError as e:
+        if unique_violation(e, "admins", ("email",)):
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
+                status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El correo electrónico ya está en uso"
             )
-
-    for key, value in admin_update.dict(exclude_unset=True).items():
-        setattr(db_admin, key, value)
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error de integridad al actualizar el administrador",
         )
+    if not db_admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail="Admin no encontrado"
+        )
 
-    db.refresh(db_admin)
+    # Solo la entrada del email anterior (rol, estado o el propio email cambiaron)
+    invalidate_admin_cache(previous_email)
     return db_admin
 
 # Eliminar un admin (solo accesible para admin)
 @router.delete("/{admin_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_admin(
+async def delete_admin(
     admin_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_admin_user),
 ):
-    db_admin = db.query(Admin).filter(Admin.id == admin_id).first()
-    if not db_admin:
+    email = await run_db(db, crud.delete_admin, admin_id)
+    if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Admin no encontrado"
         )
 
-    db.delete(db_admin)
-    db.commit()
+    invalidate_admin_cache(email)
     return {"detail": "Admin eliminado exitosamente"}
 
 
+# Perfiles recientes (más nuevo primero), sin el reporte ni el SQL
+@router.get("/profiles")
+async def list_profiles(current_admin: Admin = Depends(get_admin_user)):
+    return get_profiles()
+
+
+# Perfil completo: reporte del perfilador y sentencias SQL de la solicitud
+@router.get("/profiles/{profile_id}")
+async def read_profile(profile_id: int, current_admin: Admin = Depends(get_admin_user)):
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil no encontrado",
+        )
+    return profile
+
+
 # Login para obtener token de administrador
 @router.post("/login", response_model=dict)
-def login_for_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_for_access_token(
+    request: Request,
+    db: Session = Depends(get_session),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ):
+    # Límite por IP y por usuario antes de tocar la base o bcrypt
+    ip = request.client.host if request.client else "unknown"
+    rejected = await login_limiter.check(ip, form_data.username)
+    if rejected:
+        reason, retry_after = rejected
+        login_rate_limited_total.inc(reason=reason)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión, intenta más tarde",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
     # Buscar al administrador por su correo electrónico
-    admin: Admin = db.query(Admin).filter(Admin.email == form_data.username).first()
+    admin: Admin = await run_db(db, crud.get_admin_by_email, form_data.username)
 
     # Verificar si el administrador existe y si la contraseña es correcta
-    if not admin or not verify_password(form_data.password, admin.hashed_password):
+    if not admin or not await verify_password(
+        form_data.password, admin.hashed_password
+    ):
+        await login_limiter.failure(ip, form_data.username)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuario o contraseña incorrectos",
         )
+    await login_limiter.success(ip, form_data.username)
 
     # Crear el token de acceso utilizando la función importada
     access_token = create_access_token(data={"sub": admin.email, "role": admin.role})
@@ -103,27 +148,16 @@ def login_for_access_token(
 
 # Crear un nuevo admin (solo accesible para admin)
 @router.post("/register", response_model=AdminOut)
-def create_admin(
+async def create_admin(
     admin: AdminCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_admin_user),
 ):
-    db_admin = db.query(Admin).filter(Admin.email == admin.email).first()
-    if db_admin:
+    hashed_password = await hash_password(admin.password)
+    try:
+        return await run_db(db, crud.create_admin, admin, hashed_password)
+    except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Correo electrónico ya existente",
         )
-
-    hashed_password = get_password_hash(admin.password)
-    new_admin = Admin(
-        name=admin.name,
-        email=admin.email,
-        hashed_password=hashed_password,
-        role=admin.role,
-        is_active=admin.is_active,
-    )
-    db.add(new_admin)
-    db.commit()
-    db.refresh(new_admin)
-    return new_admin
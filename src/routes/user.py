@@ -1,148 +1,527 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import logging
+import time
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from models.user import User
 from models.admin import Admin
-from schemas.user import UserCreate, UserOut, UserUpdate
+from schemas.user import (
+    UserBulkSelection,
+    UserBulkUpdate,
+    UserChangesPage,
+    UserCreate,
+    UserFilters,
+    UserOut,
+    UserStats,
+    UserUpdate,
+    USER_OUT_FIELDS,
+)
+from crud import user as crud
+from pagination import encode_cursor, decode_cursor
+from filters import bulk_conditions, validate_filters
+from export import MEDIA_TYPES, stream_users
+from responses import FastJSONResponse, rows_to_dicts
+from cache import user_cache
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from database import release, unique_violation
+from conditional import (
+    make_etag,
+    page_etag,
+    projection_etag,
+    http_date,
+    parse_version,
+    is_not_modified,
+    validator_headers,
+    not_modified_response,
+    pack_entry,
+    unpack_entry,
+)
 from dependencies import (
-    get_db,
+    get_session,
+    get_read_session,
+    run_db,
     get_admin_user,
     get_read_write_user,
     get_read_only_user,
 )
-from utils import (
-    get_password_hash,
-    validate_curp,
-    validate_rfc,
-    validate_cp,
-    validate_phone,
-    validate_date,
+from hashing import hash_password, hash_passwords
+from bulk import (
+    BULK_CHUNK_SIZE,
+    BULK_MAX_RECORDS,
+    DUPLICATE_MESSAGES,
+    parse_records,
+    validate_records,
+    unique_values,
+    duplicate_errors,
+)
+from utils import validate_user_fields
+from replicas import used_replica
+from changes import (
+    USER_CHANGES_MAX_WAIT,
+    USER_CHANGES_POLL_INTERVAL,
+    change_entries,
+    change_events,
+    change_notifier,
 )
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+user_not_found_exception = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Usuario no encontrado o inexistente",
+)
+
+precondition_failed_exception = HTTPException(
+    status_code=status.HTTP_412_PRECONDITION_FAILED,
+    detail="El usuario cambió desde la versión indicada en If-Match",
+)
+
+
+# Las restricciones únicas detectan duplicados; se responde con los mensajes de siempre
+def integrity_exception(error: IntegrityError) -> HTTPException:
+    field = unique_violation(error, "user", DUPLICATE_MESSAGES)
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=DUPLICATE_MESSAGES.get(field, "Error de integridad al guardar el usuario"),
+    )
+
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return list(USER_OUT_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    invalid = [field for field in selected if field not in USER_OUT_FIELDS]
+    if invalid or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos: {', '.join(invalid)}",
+        )
+    return list(dict.fromkeys(selected))
+
+
 # Crear usuario
 @router.post("/", response_model=UserOut)
-def create_user(
+async def create_user(
     user: UserCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_admin_user),
 ):
 
     # Validar CURP, RFC, CP, teléfono, y fecha
-    if user.curp:
-        validate_curp(user.curp)
-    if user.rfc:
-        validate_rfc(user.rfc)
-    if user.cp:
-        validate_cp(user.cp)
-    if user.phone:
-        validate_phone(user.phone)
-    if user.date:
-        validate_date(user.date)
-
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    validate_user_fields(user)
+
+    hashed_password = await hash_password(user.password)
+    try:
+        created = await run_db(db, crud.create_user, user, hashed_password)
+    except IntegrityError as e:
+        raise integrity_exception(e)
+    change_notifier.notify()
+    return created
+
+
+# Carga masiva de usuarios: arreglo JSON o NDJSON (Content-Type: application/x-ndjson)
+@router.post("/bulk")
+async def bulk_create_users(
+    request: Request,
+    db: Session = Depends(get_session),
+    current_admin: Admin = Depends(get_admin_user),
+):
+    records = parse_records(
+        await request.body(), request.headers.get("content-type", "")
+    )
+    valid, errors = validate_records(records)
+
+    # Unicidad contra la base con una consulta por conjunto, no una por usuario
+    existing = await run_db(
+        db, crud.find_existing_unique_values, unique_values(valid)
+    )
+    for index, user in list(valid.items()):
+        record_errors = duplicate_errors(user, existing)
+        if record_errors:
+            errors[index] = record_errors
+            del valid[index]
+
+    indexes = list(valid)
+    hashed_passwords = await hash_passwords([valid[i].password for i in indexes])
+    rows = [
+        {**valid[i].model_dump(exclude={"password"}), "hashed_password": hashed}
+        for i, hashed in zip(indexes, hashed_passwords)
+    ]
+    ids = await run_db(db, crud.bulk_insert_users, rows, BULK_CHUNK_SIZE)
+    change_notifier.notify()
+    for index, user_id in zip(indexes, ids):
+        if user_id is None:
+            errors[index] = [{"field": None, "msg": "Conflicto de unicidad al insertar"}]
+
+    created = dict(zip(indexes, ids))
+    results = [
+        {"index": index, "status": "error", "errors": errors[index]}
+        if index in errors
+        else {"index": index, "status": "created", "id": created[index]}
+        for index in range(len(records))
+    ]
+    return {
+        "created": len(records) - len(errors),
+        "failed": len(errors),
+        "results": results,
+    }
+
+
+def check_bulk_ids(selection: UserBulkSelection) -> None:
+    if selection.ids is not None and len(selection.ids) > BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {BULK_MAX_RECORDS} ids por operación",
+        )
+
+
+async def invalidate_users(user_ids: list[int]) -> None:
+    for user_id in user_ids:
+        await user_cache.delete(user_id)
+    if user_ids:
+        change_notifier.notify()
+
+
+# Ejecuta un UPDATE/DELETE en lote e invalida lo escrito, también si un bloque falla
+# después de confirmar los anteriores
+async def run_bulk_write(db, fn, *args) -> dict:
+    try:
+        affected = await run_db(db, fn, *args)
+    except crud.BulkWriteError as e:
+        await invalidate_users(e.affected)
+        logger.exception("Escritura en lote interrumpida")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "msg": "La operación se interrumpió; solo se aplicó a los usuarios indicados",
+                "affected": len(e.affected),
+            },
+        )
+    await invalidate_users(affected)
+    return {"affected": len(affected)}
+
+
+# Actualización en lote por ids y/o filtros: un UPDATE por bloque de ids
+@router.patch("/bulk")
+async def bulk_update_users(
+    body: UserBulkUpdate,
+    db: Session = Depends(get_session),
+    current_admin: Admin = Depends(get_read_write_user),
+):
+    values = body.values.model_dump(exclude_unset=True)
+    if not values:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="el correo electrónico usado ya existe",
+            detail="No hay campos para actualizar",
         )
+    # Mismas validaciones de CP, teléfono y fecha que en la actualización individual
+    validate_user_fields(body.values)
+    check_bulk_ids(body)
+    conditions = bulk_conditions(body)
 
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        name=user.name,
-        email=user.email,
-        hashed_password=hashed_password,
-        is_active=user.is_active,
-        rfc=user.rfc,
-        curp=user.curp,
-        cp=user.cp,
-        phone=user.phone,
-        address=user.address,
-        date=user.date,
+    return await run_bulk_write(
+        db, crud.bulk_update_users, values, body.ids, conditions, BULK_CHUNK_SIZE
+    )
+
+
+# Eliminación en lote por ids y/o filtros: un DELETE por bloque de ids
+@router.delete("/bulk")
+async def bulk_delete_users(
+    body: UserBulkSelection,
+    db: Session = Depends(get_session),
+    current_admin: Admin = Depends(get_admin_user),
+):
+    check_bulk_ids(body)
+    conditions = bulk_conditions(body)
+    return await run_bulk_write(
+        db, crud.bulk_delete_users, body.ids, conditions, BULK_CHUNK_SIZE
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
 
 
-# Obtener lista de usuarios
-@router.get("/", response_model=list[UserOut])
-def read_users(
+# Obtener lista de usuarios. La respuesta sale ya serializada y no pasa por un
+# response_model: el modelo de responses solo documenta (igual en /{user_id} y /changes)
+@router.get("/", responses={200: {"model": list[UserOut]}})
+async def read_users(
+    request: Request,
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    sort: Literal["id", "name", "date"] = "id",
+    fields: Optional[str] = None,
+    filters: UserFilters = Depends(),
+    db: Session = Depends(get_read_session),
     current_admin: Admin = Depends(get_read_only_user),
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    columns = parse_fields(fields)
+    validate_filters(filters)
+    if cursor and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede combinar skip con cursor",
+        )
 
+    # skip se mantiene por compatibilidad; cursor evita recorrer filas descartadas
+    after = decode_cursor(cursor, sort) if cursor else None
+    users = await run_db(
+        db, crud.get_user_rows, skip, limit, sort, after, filters, columns
+    )
 
-# Obtener usuario por ID
-@router.get("/{user_id}", response_model=UserOut)
-def read_user(
-    user_id: int,
-    db: Session = Depends(get_db),
+    # El cursor de la siguiente página viaja en un header para no cambiar el cuerpo
+    headers = {}
+    if users and len(users) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(sort, users[-1])
+
+    # La validación condicional usa solo id/versión, sin serializar la página
+    etag = page_etag(
+        ((u.id, u.version) for u in users),
+        sort,
+        skip,
+        cursor,
+        limit,
+        ",".join(columns),
+        filters.model_dump_json(exclude_none=True),
+    )
+    # Sin Last-Modified: borrar una fila no sube el máximo de updated_at y un
+    # If-Modified-Since respondería 304 con la página anterior; basta la ETag
+    headers.update(validator_headers(etag, None))
+    if is_not_modified(request, etag, None):
+        not_modified = not_modified_response(etag, None)
+        not_modified.headers.update(headers)
+        return not_modified
+
+    # Las columnas ya cumplen UserOut: se serializan sin un modelo Pydantic por fila
+    return FastJSONResponse(rows_to_dicts(users, columns), headers=headers)
+
+
+# Exportar todos los usuarios en streaming (NDJSON o CSV) con memoria constante
+@router.get("/export")
+async def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = None,
+    filters: UserFilters = Depends(),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_read_only_user),
 ):
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    columns = parse_fields(fields)
+    validate_filters(filters)
+    query = crud.export_users_query(columns, filters)
+    return StreamingResponse(
+        stream_users(db, query, columns, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+
+# Total y agregados sin COUNT(*): lectura de la tabla de contadores
+@router.get("/stats", response_model=UserStats)
+async def read_user_stats(
+    db: Session = Depends(get_session),
+    current_admin: Admin = Depends(get_read_only_user),
+):
+    return await run_db(db, crud.get_user_stats)
+
+
+# Reconciliación manual de los contadores con un conteo completo; devuelve la deriva
+@router.post("/stats/reconcile")
+async def reconcile_user_stats(
+    db: Session = Depends(get_session),
+    current_admin: Admin = Depends(get_admin_user),
+):
+    drift = await run_db(db, crud.reconcile_user_stats)
+    return {
+        "corrected": {
+            name: {"stored": stored, "actual": actual}
+            for name, (stored, actual) in drift.items()
+        }
+    }
+
+
+# Cambios de usuarios posteriores a since, del registro que llenan los triggers. Sin
+# since solo devuelve el seq actual (para empezar tras una sincronización completa).
+# wait mantiene la consulta abierta hasta esos segundos si aún no hay cambios
+# (long-poll); con Accept: text/event-stream se envían como Server-Sent Events
+@router.get("/changes", responses={200: {"model": UserChangesPage}})
+async def read_user_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: Optional[float] = Query(None, ge=0),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_session),
+    current_admin: Admin = Depends(get_read_only_user),
+):
+    columns = parse_fields(fields)
+    stream = "text/event-stream" in request.headers.get("accept", "")
+    last_event_id = request.headers.get("last-event-id", "")
+    if stream and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    head, valid = await run_db(db, crud.get_user_change_head, since)
+    if since is None:
+        since = head
+    elif not valid:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuario no encontrado o inexistente",
+            status_code=status.HTTP_410_GONE,
+            detail="Los cambios posteriores a since ya se compactaron; "
+            "sincroniza con GET /users/ y continúa desde el seq actual",
         )
-    return user
+
+    if wait is None:
+        wait = USER_CHANGES_MAX_WAIT if stream else 0
+    wait = min(wait, USER_CHANGES_MAX_WAIT)
+    if stream:
+        return StreamingResponse(
+            change_events(db, since, limit, columns, wait),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    deadline = time.monotonic() + wait
+    while True:
+        generation = change_notifier.generation
+        rows = await run_db(db, crud.get_user_changes, since, limit, columns)
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            break
+        # Sin cambios todavía: la conexión vuelve al pool mientras se espera
+        await release(db)
+        await change_notifier.wait(
+            generation, min(remaining, USER_CHANGES_POLL_INTERVAL)
+        )
+    return FastJSONResponse(
+        {
+            "changes": change_entries(rows, columns),
+            "next": rows[-1][0] if rows else since,
+        }
+    )
+
+
+# Obtener usuario por ID (lectura a través de la caché de respuestas serializadas).
+# Con fields solo se leen esas columnas y la ETag incluye la lista de columnas
+@router.get("/{user_id}", responses={200: {"model": UserOut}})
+async def read_user(
+    user_id: int,
+    request: Request,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_session),
+    current_admin: Admin = Depends(get_read_only_user),
+):
+    columns = parse_fields(fields) if fields is not None else None
+    entry = await user_cache.get(user_id)
+    if entry is None and columns is not None:
+        return await read_user_projection(request, db, user_id, columns)
+    if entry is None:
+        generation = await user_cache.generation(user_id)
+        user = await run_db(db, crud.get_user, user_id)
+        if user is None:
+            raise user_not_found_exception
+        etag = make_etag(user.id, user.version)
+        last_modified = http_date(user.updated_at)
+        # 304 sin construir ni serializar el UserOut
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        payload = UserOut.model_validate(user).model_dump_json().encode()
+        entry = pack_entry(etag, last_modified, payload)
+        # Solo lo leído en la primaria: una réplica atrasada volvería a llenar la
+        # caché con la fila anterior a un PUT/DELETE por todo USER_CACHE_TTL
+        if not used_replica(db):
+            await user_cache.set(user_id, entry, generation)
+
+    etag, last_modified, payload = unpack_entry(entry)
+    if columns is not None:
+        etag = projection_etag(etag, columns)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    if columns is not None:
+        # Con el usuario en caché la proyección sale de ahí, sin ir a la base
+        user = json.loads(payload)
+        return FastJSONResponse(
+            {field: user[field] for field in columns},
+            headers=validator_headers(etag, last_modified),
+        )
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers=validator_headers(etag, last_modified),
+    )
+
+
+async def read_user_projection(
+    request: Request, db: Session, user_id: int, columns: list[str]
+) -> Response:
+    row = await run_db(db, crud.get_user_row, user_id, columns)
+    if row is None:
+        raise user_not_found_exception
+    etag = projection_etag(make_etag(row.id, row.version), columns)
+    last_modified = http_date(row.updated_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return FastJSONResponse(
+        rows_to_dicts([row], columns)[0],
+        headers=validator_headers(etag, last_modified),
+    )
 
 
 # Actualizar usuario
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_read_write_user),
 ):
-    db_user = db.query(User).filter(User.id == user_id).first()
+    # Validar campos antes de actualizar
+    validate_user_fields(user_update)
+
+    # If-Match: concurrencia optimista sobre la versión de la fila
+    if_match = request.headers.get("if-match")
+    expected_version = None
+    if if_match is not None and if_match.strip() != "*":
+        expected_version = parse_version(if_match, user_id)
+        if expected_version is None:
+            raise precondition_failed_exception
+
+    try:
+        db_user = await run_db(
+            db, crud.update_user, user_id, user_update, expected_version
+        )
+    except StaleDataError:
+        raise precondition_failed_exception
+    except IntegrityError as e:
+        raise integrity_exception(e)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado o inexistente",
         )
-
-    # Validar campos antes de actualizar
-    if user_update.curp:
-        validate_curp(user_update.curp)
-    if user_update.rfc:
-        validate_rfc(user_update.rfc)
-    if user_update.cp:
-        validate_cp(user_update.cp)
-    if user_update.phone:
-        validate_phone(user_update.phone)
-    if user_update.date:
-        validate_date(user_update.date)
-
-    for key, value in user_update.dict(exclude_unset=True).items():
-        setattr(db_user, key, value)
-
-    db.commit()
-    db.refresh(db_user)
+    await user_cache.delete(user_id)
+    change_notifier.notify()
+    response.headers.update(
+        validator_headers(
+            make_etag(db_user.id, db_user.version), http_date(db_user.updated_at)
+        )
+    )
     return db_user
 
 
 # Eliminar usuario
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_admin: Admin = Depends(get_admin_user),
 ):
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
+    if not await run_db(db, crud.delete_user, user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado o inexistente",
         )
-
-    db.delete(db_user)
-    db.commit()
+    await user_cache.delete(user_id)
+    change_notifier.notify()
     return {"detail": "usuario eliminado exitosamente"}
@@ -27,3 +27,7 @@ class AdminOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Columnas públicas de un administrador, en el orden de AdminOut
+ADMIN_OUT_FIELDS = tuple(AdminOut.model_fields)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, field_validator
+from typing import Literal, Optional
 
 class UserBase(BaseModel):
     name: str
@@ -23,3 +24,86 @@ class UserOut(UserBase):
 
     class Config:
         from_attributes = True
+
+
+# Columnas públicas de un usuario, en el orden usado por las exportaciones
+USER_OUT_FIELDS = ("id", *UserBase.model_fields)
+
+
+# Totales de GET /users/stats (contadores mantenidos por triggers)
+class UserStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    # Usuarios por prefijo de código postal (dos dígitos)
+    cp_prefixes: dict[str, int]
+
+
+# Entrada de GET /users/changes; user es el estado actual (None tras una baja)
+class UserChange(BaseModel):
+    seq: int
+    op: Literal["create", "update", "delete"]
+    user_id: int
+    version: Optional[int] = None
+    changed_at: datetime
+    user: Optional[UserOut] = None
+
+
+class UserChangesPage(BaseModel):
+    changes: list[UserChange]
+    # seq a enviar como since en la siguiente consulta
+    next: int
+
+
+# Filtros de GET /users/ y /users/export; todos se resuelven con un índice
+class UserFilters(BaseModel):
+    # Coincidencia exacta
+    cp: Optional[str] = None
+    phone: Optional[str] = None
+    rfc: Optional[str] = None
+    curp: Optional[str] = None
+    is_active: Optional[bool] = None
+    # Prefijo (rango sobre el índice)
+    name: Optional[str] = None
+    email: Optional[str] = None
+    # Rango de fechas DD-MM-YYYY, ambos extremos incluidos
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    # Edad cumplida en años, calculada a partir de la fecha
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    # Búsqueda de texto sobre nombre, correo y dirección
+    q: Optional[str] = None
+
+
+# Filtros de PATCH/DELETE /users/bulk: los de GET /users/ más CP dentro de un conjunto
+class UserBulkFilters(UserFilters):
+    cp_in: Optional[list[str]] = None
+
+
+# Usuarios de una operación en lote: lista de ids, filtros o ambos (intersección)
+class UserBulkSelection(BaseModel):
+    ids: Optional[list[int]] = None
+    filters: Optional[UserBulkFilters] = None
+
+
+# Campos asignables en lote; email, RFC y CURP son únicos y no se incluyen
+class UserBulkValues(BaseModel):
+    is_active: Optional[bool] = None
+    cp: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    date: Optional[str] = None
+
+    # Omitir un campo lo deja igual; null o "" lo borrarían en toda la selección
+    # (y "" ni siquiera pasa por los validadores de formato)
+    @field_validator("*")
+    @classmethod
+    def reject_empty(cls, value):
+        if value is None or value == "":
+            raise ValueError("No se permite null ni vacío; omite el campo para no cambiarlo")
+        return value
+
+
+class UserBulkUpdate(UserBulkSelection):
+    values: UserBulkValues
@@ -0,0 +1,31 @@
+import os
+import asyncio
+import logging
+import config  # noqa: F401  (carga el .env)
+
+from database import SessionLocal
+from crud.user import reconcile_user_stats
+
+# Segundos entre reconciliaciones de user_stats con un conteo completo; 0 la desactiva
+USER_STATS_RECONCILE_INTERVAL = float(os.getenv("USER_STATS_RECONCILE_INTERVAL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile() -> dict[str, tuple[int, int]]:
+    with SessionLocal() as db:
+        return reconcile_user_stats(db)
+
+
+# Tarea de fondo del lifespan: corrige la deriva de los contadores (escrituras
+# fuera de la API con los triggers desactivados, restauraciones parciales)
+async def reconcile_periodically(interval: float = USER_STATS_RECONCILE_INTERVAL) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            drift = await asyncio.to_thread(reconcile)
+        except Exception:
+            logger.exception("No se pudieron reconciliar los contadores de usuarios")
+            continue
+        if drift:
+            logger.warning("Contadores de usuarios corregidos: %s", drift)
@@ -1,69 +1,76 @@
-import re
 import os
-from dotenv import load_dotenv
+import config  # noqa: F401  (carga el .env)
 from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from models.admin import Admin
 from sqlalchemy.orm import Session
+from hashing import pwd_context
+from metrics import password_hash_duration_seconds
+from validation import (
+    CURP_REGEX,
+    RFC_REGEX,
+    CP_REGEX,
+    PHONE_REGEX,
+    DATE_REGEX,
+    check_curp,
+    check_rfc,
+    check_cp,
+    check_phone,
+    check_date,
+    validate_record,
+)
 
-load_dotenv()
-
-CURP_REGEX = r"^[A-Z]{4}\d{6}[H|M][A-Z]{5}[A-Z0-9]{2}$"
-RFC_REGEX = r"^[A-ZÑ&]{3,4}\d{6}[A-Z0-9]{3}$"
-CP_REGEX = r"^\d{5}$"
-PHONE_REGEX = r"^\d{10}$"
-DATE_REGEX = r"^\d{2}-\d{2}-\d{4}$"
-
-pwd_context = CryptContext(schemes=["bcrypt"], default="bcrypt", deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> CryptContext:
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_hash_duration_seconds.time(operation="verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> CryptContext:
-    return pwd_context.hash(password)
+    with password_hash_duration_seconds.time(operation="hash"):
+        return pwd_context.hash(password)
 
 
 def validate_curp(curp: str) -> None:
-    if not re.match(CURP_REGEX, curp):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El CURP no esta en el formato oficial",
-        )
+    message = check_curp(curp)
+    if message:
+        handle_validate_error(message)
 
 
 def validate_rfc(rfc: str) -> None:
-    if not re.match(RFC_REGEX, rfc):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El RFC no esta en el formato oficial",
-        )
+    message = check_rfc(rfc)
+    if message:
+        handle_validate_error(message)
 
 
 def validate_cp(cp: str) -> None:
-    if not re.match(CP_REGEX, cp):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El código postal no esta en el formato oficial",
-        )
+    message = check_cp(cp)
+    if message:
+        handle_validate_error(message)
 
 
 def validate_phone(phone: str) -> None:
-    if not re.match(PHONE_REGEX, phone):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El número de teléfono no esta en el formato oficial",
-        )
+    message = check_phone(phone)
+    if message:
+        handle_validate_error(message)
 
 
 def validate_date(date: str) -> None:
-    if not re.match(DATE_REGEX, date):
+    message = check_date(date)
+    if message:
+        handle_validate_error(message)
+
+
+# Valida todos los campos del usuario y reporta todos los errores juntos
+def validate_user_fields(user) -> None:
+    errors = validate_record(user)
+    if errors:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La fecha no esta en el formato oficial",
+            detail=errors,
         )
 
 
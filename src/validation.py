@@ -0,0 +1,151 @@
+import re
+import operator
+from typing import Any, Callable, Iterable, Optional
+
+CURP_REGEX = r"^[A-Z]{4}\d{6}[HM][A-Z]{5}[A-Z0-9]\d$"
+RFC_REGEX = r"^[A-ZÑ&]{3,4}\d{6}[A-Z0-9]{3}$"
+CP_REGEX = r"^\d{5}$"
+PHONE_REGEX = r"^\d{10}$"
+DATE_REGEX = r"^\d{2}-\d{2}-\d{4}$"
+
+# Patrones compilados una sola vez; se reusa su método match en los lotes
+CURP_MATCH = re.compile(CURP_REGEX).match
+RFC_MATCH = re.compile(RFC_REGEX).match
+CP_MATCH = re.compile(CP_REGEX).match
+PHONE_MATCH = re.compile(PHONE_REGEX).match
+DATE_MATCH = re.compile(DATE_REGEX).match
+
+CURP_MESSAGE = "El CURP no esta en el formato oficial"
+CURP_DATE_MESSAGE = "La fecha del CURP no es válida"
+CURP_CHECK_DIGIT_MESSAGE = "El dígito verificador del CURP no es válido"
+RFC_MESSAGE = "El RFC no esta en el formato oficial"
+RFC_DATE_MESSAGE = "La fecha del RFC no es válida"
+CP_MESSAGE = "El código postal no esta en el formato oficial"
+PHONE_MESSAGE = "El número de teléfono no esta en el formato oficial"
+DATE_MESSAGE = "La fecha no esta en el formato oficial"
+DATE_CALENDAR_MESSAGE = "La fecha no existe en el calendario"
+
+CURP_CHARSET = {char: value for value, char in enumerate("0123456789ABCDEFGHIJKLMNÑOPQRSTUVWXYZ")}
+# Tabla latin-1 -> valor para calcular el dígito con bytes.translate
+CURP_TABLE = bytes(CURP_CHARSET.get(chr(code), 0) for code in range(256))
+CURP_WEIGHTS = tuple(range(18, 1, -1))
+
+DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+# Comparaciones simples en lugar de datetime.date para no pagar excepciones
+def _valid_date(year: int, month: int, day: int) -> bool:
+    # El año 0 sería bisiesto pero no existe en datetime.date
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= DAYS_IN_MONTH[month]:
+        return False
+    if month == 2 and day == 29:
+        return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return True
+
+
+# Segmento AAMMDD: el siglo no viene en el dato, basta con que exista en alguno
+def _valid_yymmdd(segment: str, centuries: Iterable[int] = (1900, 2000)) -> bool:
+    mm, dd = segment[2:4], segment[4:6]
+    # Camino rápido: cualquier mes válido tiene del día 01 al 28
+    if "01" <= mm <= "12" and "01" <= dd <= "28":
+        return True
+    yy = int(segment[:2])
+    return any(_valid_date(century + yy, int(mm), int(dd)) for century in centuries)
+
+
+def curp_check_digit(curp: str) -> int:
+    values = curp[:17].encode("latin-1").translate(CURP_TABLE)
+    total = sum(map(operator.mul, values, CURP_WEIGHTS))
+    return (10 - total % 10) % 10
+
+
+# Cada check devuelve el mensaje de error o None si el valor es válido
+def check_curp(curp: str) -> Optional[str]:
+    if not CURP_MATCH(curp):
+        return CURP_MESSAGE
+    # El penúltimo carácter es dígito para nacidos antes de 2000 y letra después
+    century = 1900 if curp[16].isdigit() else 2000
+    if not _valid_yymmdd(curp[4:10], (century,)):
+        return CURP_DATE_MESSAGE
+    if curp_check_digit(curp) != int(curp[17]):
+        return CURP_CHECK_DIGIT_MESSAGE
+    return None
+
+
+def check_rfc(rfc: str) -> Optional[str]:
+    if not RFC_MATCH(rfc):
+        return RFC_MESSAGE
+    if not _valid_yymmdd(rfc[-9:-3]):
+        return RFC_DATE_MESSAGE
+    return None
+
+
+def check_cp(cp: str) -> Optional[str]:
+    return None if CP_MATCH(cp) else CP_MESSAGE
+
+
+def check_phone(phone: str) -> Optional[str]:
+    return None if PHONE_MATCH(phone) else PHONE_MESSAGE
+
+
+def check_date(value: str) -> Optional[str]:
+    if not DATE_MATCH(value):
+        return DATE_MESSAGE
+    dd, mm = value[:2], value[3:5]
+    if "01" <= mm <= "12" and "01" <= dd <= "28" and value[6:] != "0000":
+        return None
+    if not _valid_date(int(value[6:]), int(mm), int(dd)):
+        return DATE_CALENDAR_MESSAGE
+    return None
+
+
+FIELD_CHECKS: dict[str, Callable[[str], Optional[str]]] = {
+    "curp": check_curp,
+    "rfc": check_rfc,
+    "cp": check_cp,
+    "phone": check_phone,
+    "date": check_date,
+}
+
+
+def _getter(record: Any) -> Callable[[str], Any]:
+    if isinstance(record, dict):
+        return record.get
+    return lambda field: getattr(record, field, None)
+
+
+# Valida un registro completo (dict o modelo) y devuelve todos sus errores
+def validate_record(record: Any) -> list[dict]:
+    get = _getter(record)
+    errors = []
+    for field, check in FIELD_CHECKS.items():
+        value = get(field)
+        if value:
+            message = check(value)
+            if message:
+                errors.append({"field": field, "msg": message})
+    return errors
+
+
+# Valida una columna completa; devuelve un mensaje (o None) por valor
+def validate_column(field: str, values: Iterable[Optional[str]]) -> list[Optional[str]]:
+    check = FIELD_CHECKS[field]
+    return [check(value) if value else None for value in values]
+
+
+def _column(records: list[Any], field: str) -> list[Any]:
+    if all(isinstance(record, dict) for record in records):
+        return [record.get(field) for record in records]
+    return [_getter(record)(field) for record in records]
+
+
+# Valida un lote columna por columna; solo incluye los índices con errores
+def validate_batch(records: list[Any]) -> dict[int, list[dict]]:
+    errors: dict[int, list[dict]] = {}
+    for field, check in FIELD_CHECKS.items():
+        for index, value in enumerate(_column(records, field)):
+            if value:
+                message = check(value)
+                if message:
+                    errors.setdefault(index, []).append({"field": field, "msg": message})
+    return errors
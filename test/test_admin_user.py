@@ -1,3 +1,4 @@
+import time
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -7,14 +8,13 @@ from sqlalchemy.orm import sessionmaker
 from main import app
 from database import Base, get_db
 from models.admin import Admin
+from schemas.admin import AdminOut
 from utils import get_password_hash
 
 # Create a test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# El engine se crea en setup_db, en un directorio temporal fuera del árbol
+engine = None
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 
 # Override the get_db dependency
@@ -32,9 +32,15 @@ client = TestClient(app)
 
 
 @pytest.fixture(scope="module")
-def setup_db():
-    # Drop all tables to ensure a clean state
-    Base.metadata.drop_all(bind=engine)
+def setup_db(tmp_path_factory):
+    global engine
+    engine = create_engine(
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    TestingSessionLocal.configure(bind=engine)
+    # Otros módulos de prueba registran su propio override al importarse
+    app.dependency_overrides[get_db] = override_get_db
 
     # Create the tables in the test database
     Base.metadata.create_all(bind=engine)
@@ -56,6 +62,7 @@ def setup_db():
 
     # Drop all tables after the tests
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="module")
@@ -93,6 +100,8 @@ def test_read_admins(admin_token):
     response = client.get("/admin/", headers=headers)
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+    for item in response.json():
+        assert AdminOut.model_validate(item).model_dump() == item
 
 def test_update_admin(admin_token):
     headers = {
@@ -138,4 +147,115 @@ def test_delete_admin(admin_token):
     # Delete the admin
     response = client.delete(f"/admin/{admin_id}", headers=headers)
     assert response.status_code == 204
-    assert response.content == b""  # Check if the response is empty
\ No newline at end of file
+    assert response.content == b""  # Check if the response is empty
+
+def test_auth_cache(admin_token):
+    from dependencies import token_cache, admin_cache, create_access_token
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    # Tras la primera lectura de la base (un fallo) el admin sale siempre de la caché
+    admin_cache.clear()
+    client.get("/admin/", headers=headers)
+    token_hits = token_cache.hits
+    admin_hits, admin_misses = admin_cache.hits, admin_cache.misses
+    for _ in range(3):
+        assert client.get("/admin/", headers=headers).status_code == 200
+    assert token_cache.hits == token_hits + 3
+    assert (admin_cache.hits, admin_cache.misses) == (admin_hits + 3, admin_misses)
+    admin_cache.clear()
+    assert client.get("/admin/", headers=headers).status_code == 200
+    assert (admin_cache.hits, admin_cache.misses) == (admin_hits + 3, admin_misses + 1)
+
+    response = client.post(
+        "/admin/register",
+        json={
+            "name": "Cached Admin",
+            "email": "cached@example.com",
+            "password": "password123",
+            "is_active": True,
+            "role": "admin",
+        },
+        headers=headers,
+    )
+    admin_id = response.json()["id"]
+
+    # Al actualizarlo sale solo su entrada (por el email anterior) y los contadores de
+    # la caché no se reinician
+    admin_cache.set("cached@example.com", {"email": "cached@example.com"})
+    admin_cache.set("other@example.com", {"email": "other@example.com"})
+    hits, misses = admin_cache.hits, admin_cache.misses
+    response = client.put(
+        f"/admin/{admin_id}",
+        json={"name": "Renamed", "email": "renamed@example.com", "password": "p",
+              "role": "admin", "is_active": True},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    # Solo la autenticación del PUT, que sale de la caché
+    assert (admin_cache.hits, admin_cache.misses) == (hits + 1, misses)
+    assert admin_cache.get("cached@example.com") is None
+    assert admin_cache.get("other@example.com") == {"email": "other@example.com"}
+
+    # Un admin desactivado deja de autenticar. En el worker que atendió el PUT la
+    # entrada se invalida y el rechazo es inmediato
+    token = create_access_token({"sub": "renamed@example.com", "role": "admin"})
+    renamed = {"Authorization": f"Bearer {token}"}
+    assert client.get("/admin/", headers=renamed).status_code == 200
+    response = client.put(
+        f"/admin/{admin_id}",
+        json={"name": "Renamed", "email": "renamed@example.com", "password": "p",
+              "role": "admin", "is_active": False},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert client.get("/admin/", headers=renamed).status_code == 401
+
+    # En otro worker su entrada sigue vigente hasta que vence (ADMIN_CACHE_TTL, aquí
+    # acortado) y después se lee de la base y se rechaza
+    admin_cache.set(
+        "renamed@example.com",
+        {"id": admin_id, "name": "Renamed", "email": "renamed@example.com",
+         "role": "admin", "is_active": True},
+        ttl=0.2,
+    )
+    assert client.get("/admin/", headers=renamed).status_code == 200
+    time.sleep(0.3)
+    assert client.get("/admin/", headers=renamed).status_code == 401
+
+    # Al eliminar el admin su entrada sale de la caché
+    admin_cache.set("renamed@example.com", {"email": "renamed@example.com"})
+    client.delete(f"/admin/{admin_id}", headers=headers)
+    assert admin_cache.get("renamed@example.com") is None
+
+
+def test_admin_unique_email(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+    data = {
+        "name": "Unique",
+        "email": "unique@example.com",
+        "password": "password123",
+        "is_active": True,
+        "role": "admin",
+    }
+
+    response = client.post("/admin/register", json=data, headers=headers)
+    assert response.status_code == 200
+    admin_id = response.json()["id"]
+
+    response = client.post("/admin/register", json=data, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Correo electrónico ya existente"
+
+    response = client.put(
+        f"/admin/{admin_id}", json={**data, "email": "johndoe@example.com"}, headers=headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "El correo electrónico ya está en uso"
+
+    response = client.put("/admin/9999", json=data, headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,129 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from main import app
+from database import Base, get_db
+from models.admin import Admin
+from utils import get_password_hash
+
+# Las rutas reciben una AsyncSession (aiosqlite), como con DATABASE_ASYNC=true
+AsyncTestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+sessions: list = []
+
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        sessions.append(db)
+        yield db
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def setup_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("db") / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            Admin.__table__.insert().values(
+                name="Administrator",
+                email="admin@example.com",
+                hashed_password=get_password_hash("securepassword"),
+                role="admin",
+                is_active=True,
+            )
+        )
+    # Cada solicitud del TestClient corre en su propio event loop: sin pool
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncTestingSessionLocal.configure(bind=async_engine)
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_async_db
+
+    yield
+
+    app.dependency_overrides[get_db] = previous
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def headers(setup_db):
+    response = client.post(
+        "/admin/login",
+        data={"username": "admin@example.com", "password": "securepassword"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['token_de_acceso']}"}
+
+
+def test_user_crud_async(headers):
+    sessions.clear()
+    response = client.post(
+        "/users/",
+        json={"name": "Async", "email": "async@example.com", "password": "p",
+              "cp": "06000", "date": "15-03-1990"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    user_id = response.json()["id"]
+    assert sessions and all(isinstance(db, AsyncSession) for db in sessions)
+
+    response = client.get(f"/users/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["date"] == "15-03-1990"
+    etag = response.headers["ETag"]
+
+    response = client.put(
+        f"/users/{user_id}",
+        json={"name": "Async 2", "email": "async@example.com"},
+        headers={**headers, "If-Match": etag},
+    )
+    assert response.status_code == 200
+    response = client.put(
+        f"/users/{user_id}",
+        json={"name": "Async 3", "email": "async@example.com"},
+        headers={**headers, "If-Match": etag},
+    )
+    assert response.status_code == 412
+    assert client.get(f"/users/{user_id}", headers=headers).json()["name"] == "Async 2"
+
+    response = client.delete(f"/users/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert client.get(f"/users/{user_id}", headers=headers).status_code == 404
+
+
+def test_list_and_export_async(headers):
+    for i in range(5):
+        response = client.post(
+            "/users/",
+            json={"name": f"Lista {i}", "email": f"lista{i}@example.com", "password": "p"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+    seen, params = [], {"limit": 2, "sort": "name"}
+    while True:
+        response = client.get("/users/", params=params, headers=headers)
+        assert response.status_code == 200
+        seen += [user["name"] for user in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == [f"Lista {i}" for i in range(5)]
+
+    response = client.get("/users/", params={"name": "Lista", "fields": "id,name"}, headers=headers)
+    assert all(set(item) == {"id", "name"} for item in response.json())
+
+    # El export en streaming usa el camino async (astream_rows)
+    response = client.get("/users/export", params={"fields": "name"}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 5
+
+    response = client.get("/users/changes", params={"since": 0}, headers=headers)
+    assert response.status_code == 200
+    assert [change["op"] for change in response.json()["changes"]][-5:] == ["create"] * 5
@@ -0,0 +1,78 @@
+import os
+import sys
+import subprocess
+from sqlalchemy import create_engine, event, func, select, text
+
+import bootstrap as bootstrap_module
+from bootstrap import bootstrap
+from migrations import MIGRATIONS, schema_version
+from models.admin import Admin
+
+SRC = os.path.dirname(os.path.abspath(bootstrap_module.__file__))
+
+
+def test_bootstrap_is_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    assert bootstrap(engine) == "created"
+    # En el mismo proceso la segunda llamada no toca la base
+    assert bootstrap(engine) == "current"
+
+    # Otro proceso (o un reinicio) solo consulta: ningún DDL ni escritura
+    bootstrap_module._prepared.discard(engine)
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    assert bootstrap(engine) == "current"
+    assert statements
+    reads = ("SELECT", "PRAGMA")
+    assert all(s.lstrip().upper().startswith(reads) for s in statements)
+
+    with engine.connect() as conn:
+        versions = conn.scalars(select(schema_version.c.version)).all()
+        assert versions == [version for version, _, _ in MIGRATIONS]
+        assert conn.scalar(select(func.count()).select_from(Admin)) == 1
+
+
+def test_bootstrap_migrates_existing_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'CREATE TABLE "user" (id INTEGER PRIMARY KEY, name VARCHAR, '
+                "email VARCHAR, hashed_password VARCHAR, is_active BOOLEAN, "
+                "rfc VARCHAR, curp VARCHAR, cp VARCHAR, phone VARCHAR, "
+                "address VARCHAR, date VARCHAR)"
+            )
+        )
+    assert bootstrap(engine) == "migrated"
+    with engine.connect() as conn:
+        assert len(conn.scalars(select(schema_version.c.version)).all()) == len(MIGRATIONS)
+
+
+# Varios workers arrancan a la vez sobre una base nueva: uno la prepara y el resto espera
+def test_concurrent_workers_bootstrap_once(tmp_path):
+    db_path = str(tmp_path / "workers.db")
+    env = {**os.environ, "DATABASE_NAME": db_path}
+    code = "from bootstrap import bootstrap; print(bootstrap())"
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", code],
+            cwd=SRC,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    results = []
+    for worker in workers:
+        out, err = worker.communicate(timeout=60)
+        assert worker.returncode == 0, err
+        results.append(out.strip())
+    assert sorted(results) == ["created", "current", "current", "current"]
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Admin)) == 1
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+import cache
+from cache import TTLCache, MemoryBackend, RedisBackend
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > time.monotonic() else None
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + ex)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    # Solo los dos scripts de RedisBackend, con la misma semántica
+    async def eval(self, script, numkeys, *args):
+        (gen_key, key), argv = args[:numkeys], args[numkeys:]
+        generation = int(await self.get(gen_key) or 0)
+        if script == cache._SET_IF_GENERATION:
+            if generation == argv[0]:
+                await self.set(key, argv[1], ex=argv[2])
+        elif script == cache._INVALIDATE:
+            await self.set(gen_key, str(generation + 1).encode(), ex=argv[0])
+            await self.delete(key)
+
+
+def test_ttl_cache_lru_and_expiry():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
+    assert cache.stats()["hits"] == 2
+
+
+async def test_memory_backend_skips_stale_set():
+    backend = MemoryBackend(maxsize=10, ttl=60)
+    generation = await backend.generation(1)
+    # Una escritura invalida la llave mientras la lectura consultaba la base
+    await backend.delete(1)
+    await backend.set(1, b"viejo", generation)
+    assert await backend.get(1) is None
+
+    await backend.set(1, b"nuevo", await backend.generation(1))
+    assert await backend.get(1) == b"nuevo"
+
+
+async def test_redis_backend():
+    backend = RedisBackend(FakeRedis(), ttl=60, prefix="user:")
+    assert await backend.get(1) is None
+    await backend.set(1, b"{}")
+    assert await backend.get(1) == b"{}"
+    await backend.delete(1)
+    assert await backend.get(1) is None
+    assert backend.stats()["hits"] == 1
+    assert backend.stats()["misses"] == 2
+
+
+async def test_redis_backend_generations_shared_between_workers():
+    redis = FakeRedis()
+    reader = RedisBackend(redis, ttl=60, prefix="user:")
+    writer = RedisBackend(redis, ttl=60, prefix="user:")
+    # Otro worker invalida la llave mientras este leía de la base
+    generation = await reader.generation(1)
+    await writer.delete(1)
+    await reader.set(1, b"viejo", generation)
+    assert await reader.get(1) is None
+
+    await reader.set(1, b"nuevo", await reader.generation(1))
+    assert await writer.get(1) == b"nuevo"
+
+
+def test_memory_backend_rejects_several_workers(monkeypatch):
+    monkeypatch.setattr(cache, "USER_CACHE_BACKEND", "memory")
+    cache.check_workers(1)
+    with pytest.raises(RuntimeError):
+        cache.check_workers(2)
+    monkeypatch.setattr(cache, "USER_CACHE_BACKEND", "redis")
+    cache.check_workers(4)
+
+
+def test_worker_count(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert cache.worker_count(["pytest"]) == 1
+    assert cache.worker_count(["/usr/bin/uvicorn", "main:app", "--workers", "4"]) == 4
+    assert cache.worker_count(["/x/uvicorn/__main__.py", "main:app", "--workers=3"]) == 3
+    # --workers de otro programa no cuenta
+    assert cache.worker_count(["bench.py", "--workers", "4"]) == 1
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    assert cache.worker_count(["/usr/bin/uvicorn", "main:app"]) == 2
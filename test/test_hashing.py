@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+
+from hashing import PasswordHasher
+
+
+# El pool se cierra aunque la prueba falle
+@pytest.fixture
+def make_hasher():
+    hashers = []
+
+    def make(**kwargs):
+        hasher = PasswordHasher(**kwargs)
+        hashers.append(hasher)
+        return hasher
+
+    yield make
+    for hasher in hashers:
+        hasher.shutdown()
+
+
+async def test_hash_and_verify(make_hasher):
+    hasher = make_hasher(workers=0, max_pending=4)
+    hashed = await hasher.hash("password123")
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("otra", hashed)
+
+
+async def test_queue_limit_returns_503(make_hasher):
+    hasher = make_hasher(workers=0, max_pending=1)
+    hashed = await hasher.hash("password123")
+
+    results = await asyncio.gather(
+        hasher.verify("password123", hashed),
+        hasher.verify("password123", hashed),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 503
+    assert hasher.pending == 0
+
+
+async def test_hash_many_counts_each_password(make_hasher):
+    # Dos hilos en lugar de procesos: mismo reparto, sin arrancar un pool de procesos
+    hasher = make_hasher(
+        workers=2, max_pending=3, executor=ThreadPoolExecutor(max_workers=2)
+    )
+    hashed = await hasher.hash("password123")
+
+    # La carga masiva nunca ocupa más lugares que workers: un login sigue entrando
+    bulk = asyncio.create_task(hasher.hash_many([f"p{i}" for i in range(6)]))
+    await asyncio.sleep(0.05)
+    assert hasher.pending == 2
+    assert await hasher.verify("password123", hashed)
+    results = await bulk
+    assert len(results) == 6 and await hasher.verify("p5", results[5])
+    assert hasher.pending == 0
@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+from main import app
+from metrics import Histogram, Counter, Registry
+
+client = TestClient(app)
+
+
+def test_histogram_render():
+    registry = Registry()
+    latency = registry.register(Histogram("latency_seconds", "Latencia", ("route",), (0.1, 1)))
+    hits = registry.register(Counter("hits_total", "Aciertos"))
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    hits.inc()
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/a"} 2' in lines
+    assert "hits_total 1" in lines
+
+
+def test_metrics_endpoint():
+    client.get("/")
+    response = client.get("/users/123", headers={"Authorization": "Bearer invalido"})
+    assert response.status_code == 401
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in body
+    # Plantilla de la ruta, no la URL concreta
+    assert 'route="/users/{user_id}"' in body
+    assert "/users/123" not in body
+    assert 'dependency_duration_seconds_count{dependency="get_current_admin"}' in body
+    assert "jwt_decode_duration_seconds_count" in body
+    assert 'cache_hits{cache="token"}' in body
@@ -0,0 +1,98 @@
+from sqlalchemy import create_engine, event, select, text
+from migrations import convert_user_date, lock_schema, run_migrations
+from models.user import User
+
+
+# Esquema anterior: fecha como texto DD-MM-YYYY, sin versión
+def create_legacy_user(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'CREATE TABLE "user" (id INTEGER PRIMARY KEY, name VARCHAR, '
+                "email VARCHAR, hashed_password VARCHAR, is_active BOOLEAN, "
+                "rfc VARCHAR, curp VARCHAR, cp VARCHAR, phone VARCHAR, "
+                "address VARCHAR, date VARCHAR)"
+            )
+        )
+        for column in ("id", "cp", "address", "date"):
+            conn.execute(text(f'CREATE INDEX ix_user_{column} ON "user" ({column})'))
+        conn.execute(
+            text('INSERT INTO "user" (name, email, date) VALUES (:name, :email, :date)'),
+            [
+                {"name": "A", "email": "a@x.mx", "date": "15-03-1990"},
+                {"name": "B", "email": "b@x.mx", "date": "31-02-1990"},
+                {"name": "C", "email": "c@x.mx", "date": None},
+            ],
+        )
+
+
+def test_convert_user_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    create_legacy_user(engine)
+
+    assert run_migrations(engine) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert run_migrations(engine) == []
+
+    with engine.connect() as conn:
+        indexes = set(
+            conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+        )
+        assert {"ix_user_date", "ix_user_cp_date", "ix_user_email"} <= indexes
+        assert not {"ix_user_id", "ix_user_cp", "ix_user_address"} & indexes
+        assert conn.scalars(text('SELECT date FROM "user" ORDER BY id')).all() == [
+            "1990-03-15", None, None,
+        ]
+        # La fecha inválida no se pierde
+        assert conn.execute(text("SELECT user_id, date FROM user_invalid_dates")).all() == [
+            (2, "31-02-1990"),
+        ]
+        assert conn.scalars(select(User.date).order_by(User.id)).all() == [
+            "15-03-1990", None, None,
+        ]
+        assert conn.scalars(
+            text("SELECT rowid FROM user_fts WHERE user_fts MATCH 'b'")
+        ).all() == [2]
+        # Contadores iniciales de las filas existentes
+        assert dict(conn.execute(text("SELECT name, count FROM user_stats")).all()) == {
+            "total": 3,
+            "active": 0,
+        }
+
+    # La tabla reconstruida con AUTOINCREMENT conserva ids, índices y triggers, y no
+    # reutiliza el id del último usuario eliminado
+    with engine.begin() as conn:
+        conn.execute(text('DELETE FROM "user" WHERE id = 3'))
+        conn.execute(
+            text('INSERT INTO "user" (name, email, version) VALUES (\'D\', \'d@x.mx\', 1)')
+        )
+    with engine.connect() as conn:
+        assert conn.scalars(text('SELECT id FROM "user" ORDER BY id')).all() == [1, 2, 4]
+        assert conn.execute(
+            text("SELECT op, user_id FROM user_changes ORDER BY seq")
+        ).all() == [("delete", 3), ("create", 4)]
+        assert conn.scalars(
+            text("SELECT rowid FROM user_fts WHERE user_fts MATCH 'd'")
+        ).all() == [4]
+        assert dict(conn.execute(text("SELECT name, count FROM user_stats")).all()) == {
+            "total": 3,
+            "active": 0,
+        }
+    engine.dispose()
+
+
+def test_convert_user_date_commits_per_batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    create_legacy_user(engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    with engine.connect() as conn:
+        lock_schema(conn)
+        convert_user_date(conn, batch_size=1)
+        conn.commit()
+    # Uno por cada lote con fecha (A y B) y el final
+    assert len(commits) == 3
+    with engine.connect() as conn:
+        assert conn.scalars(text('SELECT date FROM "user" ORDER BY id')).all() == [
+            "1990-03-15", None, None,
+        ]
+    engine.dispose()
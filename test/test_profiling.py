@@ -0,0 +1,147 @@
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from starlette.middleware import Middleware
+
+from main import app
+from database import Base, get_db
+from models.admin import Admin
+from utils import get_password_hash
+import profiling
+
+# El engine se crea en setup_db, en un directorio temporal fuera del árbol
+engine = None
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def setup_db(tmp_path_factory):
+    global engine
+    engine = create_engine(
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    TestingSessionLocal.configure(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = TestingSessionLocal()
+    admin = Admin(
+        name="Administrator",
+        email="admin@example.com",
+        hashed_password=get_password_hash("securepassword"),
+        role="admin",
+        is_active=True,
+    )
+    db.add(admin)
+    db.commit()
+    db.close()
+
+    # Las sentencias se registran sobre este engine, no el de otros módulos de prueba
+    app.dependency_overrides[get_db] = override_get_db
+    # El middleware solo se instala con PROFILING_ENABLED; aquí se agrega a mano
+    app.user_middleware.insert(0, Middleware(profiling.ProfilingMiddleware))
+    app.middleware_stack = None
+    profiling.instrument_engine(engine)
+
+    yield
+
+    app.user_middleware.pop(0)
+    app.middleware_stack = None
+    event.remove(engine, "before_cursor_execute", profiling._before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", profiling._after_cursor_execute)
+    profiling.profiles.clear()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def admin_token(setup_db):
+    response = client.post(
+        "/admin/login",
+        data={"username": "admin@example.com", "password": "securepassword"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["token_de_acceso"]
+
+
+def test_profile_on_demand(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    # Sin header, o con header pero sin token de admin, no se perfila
+    response = client.get("/users/", headers=headers)
+    assert "X-Profile-Id" not in response.headers
+    response = client.get("/", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+    assert profiling.get_profiles() == []
+
+    response = client.get("/users/", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = int(response.headers["X-Profile-Id"])
+
+    listing = client.get("/admin/profiles", headers=headers).json()
+    assert listing[0]["id"] == profile_id
+    assert listing[0]["route"] == "/users/"
+    assert listing[0]["trigger"] == "header"
+    assert "profile" not in listing[0]
+
+    profile = client.get(f"/admin/profiles/{profile_id}", headers=headers).json()
+    assert "function calls" in profile["profile"]
+    assert any(entry["statement"].startswith("SELECT") for entry in profile["sql"])
+
+    response = client.get("/admin/profiles/999999", headers=headers)
+    assert response.status_code == 404
+
+
+# Sin el admin en caché se busca en la base (en el threadpool) antes de perfilar
+def test_profile_header_cold_admin_cache(admin_token):
+    from dependencies import admin_cache
+
+    admin_cache.clear()
+    response = client.get(
+        "/", headers={"Authorization": f"Bearer {admin_token}", "X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
+
+
+def test_profile_sampling(admin_token, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1.0)
+    response = client.get("/")
+    assert "X-Profile-Id" in response.headers
+    assert profiling.get_profiles()[0]["trigger"] == "sample"
+
+
+# Con otro perfil activo (de cualquier motor) la solicitud se atiende sin perfilar
+def test_profile_one_at_a_time(admin_token, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILING_ENGINE", "pyinstrument")
+    with profiling._profile_lock:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_check_engine(monkeypatch):
+    profiling.check_engine()
+    monkeypatch.setattr(profiling, "PROFILING_ENGINE", "pyinstrument")
+    monkeypatch.setitem(sys.modules, "pyinstrument", None)
+    with pytest.raises(RuntimeError):
+        profiling.check_engine()
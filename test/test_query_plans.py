@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, select
+from models.user import User
+from database import Base
+from filters import user_conditions
+from schemas.user import UserFilters
+import pagination
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine, filters: UserFilters, sort: str = "id") -> list[str]:
+    query = (
+        select(User)
+        .where(*user_conditions(filters))
+        .order_by(*pagination.order_by(sort))
+        .limit(10)
+    )
+    compiled = query.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params)
+        return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        (UserFilters(cp="01000"), "ix_user_cp_date"),
+        (UserFilters(cp="01000", date_from="01-01-1990"), "ix_user_cp_date (cp=? AND date>?)"),
+        (UserFilters(phone="5512345678"), "ix_user_phone"),
+        (UserFilters(rfc="ABCD900101XYZ"), "ix_user_rfc"),
+        (UserFilters(curp="ABCD900101HDFRRN02"), "ix_user_curp"),
+        (UserFilters(name="Jua"), "ix_user_name"),
+        (UserFilters(email="juan@"), "ix_user_email"),
+        (UserFilters(date_from="01-01-1990", date_to="31-12-1999"), "ix_user_date"),
+        (UserFilters(age_min=18, age_max=30), "ix_user_date"),
+        (UserFilters(q="juan"), "VIRTUAL TABLE INDEX"),
+    ],
+)
+def test_filters_use_index(plan_engine, filters, index):
+    plan = query_plan(plan_engine, filters)
+    assert any(index in step for step in plan), plan
+    # Ningún filtro recorre la tabla completa
+    assert not any(step == "SCAN user" for step in plan), plan
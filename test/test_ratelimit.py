@@ -0,0 +1,128 @@
+from fastapi.testclient import TestClient
+from main import app
+from models.admin import Admin
+from crud import admin as crud_admin
+from routes import admin as admin_routes
+from hashing import verify_password
+from utils import get_password_hash
+from ratelimit import Bucket, Lockout, LoginRateLimiter, MemoryStore
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(clock, maxsize: int = 1000) -> LoginRateLimiter:
+    return LoginRateLimiter(
+        MemoryStore(maxsize),
+        ip_bucket=Bucket(10, 1 / 6),
+        user_bucket=Bucket(3, 1 / 6),
+        lockout=Lockout(threshold=3, base=10, maximum=40, window=900),
+        clock=clock,
+    )
+
+
+async def test_token_bucket():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for _ in range(3):
+        assert await limiter.check("1.1.1.1", "a@x.mx") is None
+    reason, retry_after = await limiter.check("1.1.1.1", "a@x.mx")
+    assert reason == "username"
+    assert 0 < retry_after <= 6
+    # Mayúsculas y espacios no dan un bucket nuevo
+    assert (await limiter.check("1.1.1.1", " A@X.MX"))[0] == "username"
+    # Otro usuario desde la misma IP todavía tiene intentos
+    assert await limiter.check("1.1.1.1", "b@x.mx") is None
+
+    clock.now += 6
+    assert await limiter.check("1.1.1.1", "a@x.mx") is None
+
+
+async def test_exponential_lockout():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    durations = []
+    for _ in range(6):
+        await limiter.failure("2.2.2.2", "a@x.mx")
+        rejected = await limiter.check("2.2.2.2", "a@x.mx")
+        durations.append(rejected[1] if rejected else 0)
+    assert durations == [0, 0, 10, 20, 40, 40]
+    # Se bloquea el par IP+usuario: el mismo usuario desde otra IP y otro usuario
+    # desde la misma IP siguen entrando (sujetos a sus buckets)
+    assert await limiter.check("3.3.3.3", "a@x.mx") is None
+    assert await limiter.check("2.2.2.2", "otro@x.mx") is None
+
+    # El bloqueo vence solo y un login correcto reinicia los fallos del par
+    clock.now += 40
+    assert await limiter.check("2.2.2.2", "a@x.mx") is None
+    await limiter.success("2.2.2.2", "a@x.mx")
+    await limiter.failure("2.2.2.2", "a@x.mx")
+    assert await limiter.check("2.2.2.2", "a@x.mx") is None
+
+
+async def test_success_does_not_refill_ip():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    # Intentos contra otras cuentas, intercalados con logins correctos en una propia
+    for i in range(10):
+        assert await limiter.check("5.5.5.5", f"victim{i}@x.mx") is None
+        await limiter.failure("5.5.5.5", f"victim{i}@x.mx")
+        await limiter.success("5.5.5.5", "mine@x.mx")
+    assert (await limiter.check("5.5.5.5", "victim9@x.mx"))[0] == "ip"
+
+
+async def test_memory_store_is_bounded():
+    clock = FakeClock()
+    limiter = make_limiter(clock, maxsize=50)
+    for i in range(1000):
+        await limiter.check(f"10.0.{i // 256}.{i % 256}", f"user{i}@x.mx")
+        await limiter.failure(f"10.0.{i // 256}.{i % 256}", f"user{i}@x.mx")
+    assert len(limiter.store) <= 150
+
+
+def test_credential_stuffing_keeps_bcrypt_idle(monkeypatch):
+    admin = Admin(
+        id=1,
+        name="Admin",
+        email="admin@example.com",
+        hashed_password=get_password_hash("securepassword"),
+        role="admin",
+        is_active=True,
+    )
+    lookups, verifications = [], []
+
+    def get_admin_by_email(db, email):
+        lookups.append(email)
+        return admin if email == admin.email else None
+
+    async def counting_verify(password, hashed):
+        verifications.append(password)
+        return await verify_password(password, hashed)
+
+    monkeypatch.setattr(crud_admin, "get_admin_by_email", get_admin_by_email)
+    monkeypatch.setattr(admin_routes, "verify_password", counting_verify)
+    monkeypatch.setattr(admin_routes, "login_limiter", make_limiter(FakeClock()))
+
+    # Ráfaga contra una cuenta y luego contra cuentas rotadas desde la misma IP
+    statuses = []
+    for i in range(200):
+        username = admin.email if i < 100 else f"victim{i}@example.com"
+        response = client.post(
+            "/admin/login", data={"username": username, "password": f"guess{i}"}
+        )
+        statuses.append(response.status_code)
+        if response.status_code == 429:
+            assert int(response.headers["retry-after"]) >= 1
+
+    # bcrypt solo corre hasta el bloqueo; el resto se rechaza sin consultar la base
+    assert len(verifications) == 3
+    assert len(lookups) <= 10
+    assert statuses.count(429) >= 190
+    assert statuses[:3] == [400, 400, 400]
@@ -0,0 +1,164 @@
+import shutil
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from cache import user_cache
+from database import Base, get_db
+from dependencies import create_access_token
+from models.admin import Admin
+from models.user import User
+from replicas import ReadSession, Replica, ReplicaSet, get_read_db
+from utils import get_password_hash
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def sqlite_engine(path):
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+
+def add_user(engine, n: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(name=f"Usuario {n}", email=f"user{n}@x.mx"))
+
+
+# Primaria con dos usuarios y un admin; las réplicas son copias del archivo
+@pytest.fixture
+def cluster(tmp_path):
+    primary = sqlite_engine(tmp_path / "primary.db")
+    Base.metadata.create_all(bind=primary)
+    with primary.begin() as conn:
+        conn.execute(
+            insert(Admin).values(
+                name="Administrator",
+                email="admin@example.com",
+                hashed_password=get_password_hash("securepassword"),
+                role="admin",
+                is_active=True,
+            )
+        )
+    add_user(primary, 1)
+    add_user(primary, 2)
+    replicas = []
+    for i in range(2):
+        path = tmp_path / f"replica{i}.db"
+        shutil.copy(tmp_path / "primary.db", path)
+        engine = sqlite_engine(path)
+        replicas.append(Replica(f"replica{i}", engine, engine))
+    # Escritura posterior a la copia: solo la primaria la tiene
+    add_user(primary, 3)
+    yield primary, replicas, tmp_path
+    primary.dispose()
+    for replica in replicas:
+        replica.engine.dispose()
+
+
+def emails(db) -> list[str]:
+    return db.scalars(select(User.email).order_by(User.id)).all()
+
+
+def test_replica_selection(cluster):
+    _, replicas, _ = cluster
+    round_robin = ReplicaSet(replicas)
+    assert [round_robin.choose().name for _ in range(4)] == [
+        "replica0", "replica1", "replica0", "replica1",
+    ]
+
+    least_busy = ReplicaSet(replicas, strategy="least_busy")
+    with replicas[0].engine.connect():
+        assert replicas[0].in_flight == 1
+        assert {least_busy.choose().name for _ in range(4)} == {"replica1"}
+    assert replicas[0].in_flight == 0
+
+
+def test_read_session_pins_to_primary_after_write(cluster):
+    primary, replicas, _ = cluster
+    with ReadSession(bind=primary, replicas=ReplicaSet(replicas)) as db:
+        assert emails(db) == ["user1@x.mx", "user2@x.mx"]
+        # Leer lo recién escrito en la misma sesión obliga a usar la primaria
+        db.execute(update(User).where(User.id == 1).values(name="Cambiado"))
+        assert emails(db) == ["user1@x.mx", "user2@x.mx", "user3@x.mx"]
+        assert db.scalar(select(User.name).where(User.id == 1)) == "Cambiado"
+        db.rollback()
+
+
+def test_health_check_drops_lagging_replicas(cluster):
+    primary, replicas, tmp_path = cluster
+    clock = FakeClock()
+    replica_set = ReplicaSet(replicas, max_lag=5, clock=clock)
+
+    # Copias anteriores al primer latido: sin forma de medir su retraso
+    lags = replica_set.check(primary)
+    assert lags == {"replica0": float("inf"), "replica1": float("inf")}
+    assert replica_set.choose() is None
+    with ReadSession(bind=primary, replicas=replica_set) as db:
+        assert len(emails(db)) == 3
+
+    # Copia fresca de la primaria: vuelve a la rotación
+    replicas[0].engine.dispose()
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica0.db")
+    clock.now += 1
+    assert replica_set.check(primary)["replica0"] == 1
+    assert {replica_set.choose().name for _ in range(3)} == {"replica0"}
+
+    # Sin nuevas copias el retraso crece hasta superar el máximo
+    clock.now += 10
+    assert replica_set.check(primary)["replica0"] == 11
+    assert replica_set.choose() is None
+
+
+def test_read_routes_use_replicas(cluster):
+    primary, replicas, _ = cluster
+    PrimarySession = sessionmaker(bind=primary, autoflush=False)
+    replica_set = ReplicaSet(replicas)
+
+    def override_get_db():
+        with PrimarySession() as db:
+            yield db
+
+    def override_get_read_db():
+        with ReadSession(bind=primary, replicas=replica_set, autoflush=False) as db:
+            yield db
+
+    # Un usuario 3 en caché de otras pruebas respondería sin consultar la base
+    user_cache.clear()
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    try:
+        token = create_access_token({"sub": "admin@example.com", "role": "admin"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Listado, detalle y admins salen de una réplica (sin el usuario 3)
+        response = client.get("/users/", headers=headers)
+        assert [u["email"] for u in response.json()] == ["user1@x.mx", "user2@x.mx"]
+        assert client.get("/users/3", headers=headers).status_code == 404
+        assert client.get("/users/3?fields=id", headers=headers).status_code == 404
+        # Lo leído en una réplica no llena la caché (podría ir atrasado)
+        assert client.get("/users/1", headers=headers).status_code == 200
+        assert asyncio.run(user_cache.get(1)) is None
+        response = client.get("/admin/", headers=headers)
+        assert [a["email"] for a in response.json()] == ["admin@example.com"]
+
+        # Las escrituras (y la búsqueda previa del usuario) usan la primaria
+        assert client.delete("/users/3", headers=headers).status_code == 200
+        with PrimarySession() as db:
+            assert emails(db) == ["user1@x.mx", "user2@x.mx"]
+    finally:
+        app.dependency_overrides.pop(get_read_db)
+        if previous is None:
+            app.dependency_overrides.pop(get_db)
+        else:
+            app.dependency_overrides[get_db] = previous
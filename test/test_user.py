@@ -1,3 +1,5 @@
+import json
+import base64
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -7,14 +9,13 @@ from sqlalchemy.orm import sessionmaker
 from main import app
 from database import Base, get_db
 from models.admin import Admin
+from schemas.user import UserOut
 from utils import get_password_hash
 
 # Create a test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# El engine se crea en setup_db, en un directorio temporal fuera del árbol
+engine = None
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 
 # Override the get_db dependency
@@ -32,9 +33,15 @@ client = TestClient(app)
 
 
 @pytest.fixture(scope="module")
-def setup_db():
-    # Drop all tables to ensure a clean state
-    Base.metadata.drop_all(bind=engine)
+def setup_db(tmp_path_factory):
+    global engine
+    engine = create_engine(
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    TestingSessionLocal.configure(bind=engine)
+    # Otros módulos de prueba registran su propio override al importarse
+    app.dependency_overrides[get_db] = override_get_db
 
     # Create the tables in the test database
     Base.metadata.create_all(bind=engine)
@@ -56,6 +63,7 @@ def setup_db():
 
     # Drop all tables after the tests
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="module")
@@ -75,8 +83,8 @@ def test_create_user(admin_token):
         "email": "johndoe@example.com",
         "password": "password123",
         "is_active": True,
-        "rfc": "ABCD123456XYZ",
-        "curp": "ABCD123456HABCDE12",
+        "rfc": "ABCD900101XYZ",
+        "curp": "ABCD900101HDFRRN02",
         "cp": "12345",
         "phone": "1234567890",
         "address": "Street 123",
@@ -101,6 +109,12 @@ def test_read_users(admin_token):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+    # El listado por filas produce exactamente lo mismo que UserOut
+    for item in response.json():
+        detail = client.get(f"/users/{item['id']}", headers=headers).json()
+        assert item == detail
+        assert UserOut.model_validate(item).model_dump() == item
+
 
 def test_read_user(admin_token):
     headers = {
@@ -128,6 +142,10 @@ def test_update_user(admin_token):
     assert response.status_code == 200
     assert response.json()["name"] == "John Smith"
 
+    # La lectura en caché se invalida con la actualización
+    response = client.get("/users/1", headers=headers)
+    assert response.json()["name"] == "John Smith"
+
 
 def test_delete_user(admin_token):
     headers = {
@@ -138,3 +156,676 @@ def test_delete_user(admin_token):
     response = client.delete("/users/1", headers=headers)
     assert response.status_code == 200
     assert response.json()["detail"] == "usuario eliminado exitosamente"
+
+    response = client.get("/users/1", headers=headers)
+    assert response.status_code == 404
+
+
+def test_read_users_cursor(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    for i in range(5):
+        response = client.post(
+            "/users/",
+            json={
+                "name": f"Page User {4 - i}",
+                "email": f"page{i}@example.com",
+                "password": "password123",
+            },
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+    for sort in ("id", "name"):
+        seen = []
+        params = {"limit": 2, "sort": sort}
+        while True:
+            response = client.get("/users/", params=params, headers=headers)
+            assert response.status_code == 200
+            seen += [user[sort] for user in response.json()]
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            params["cursor"] = next_cursor
+        assert seen == sorted(seen)
+        assert len(seen) == 5
+
+    # skip sigue funcionando
+    response = client.get("/users/", params={"skip": 4, "limit": 2}, headers=headers)
+    assert len(response.json()) == 1
+
+    response = client.get("/users/", params={"cursor": "basura"}, headers=headers)
+    assert response.status_code == 400
+
+    # Cursores alterados: el valor de orden debe tener el tipo y formato de la columna
+    def cursor(*data):
+        raw = json.dumps(data).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    tampered = [
+        ("name", ["name", 5, 1]),
+        ("name", ["name", ["x"], 1]),
+        ("date", ["date", 19900315, 1]),
+        ("date", ["date", "1990-03-15", 1]),
+        ("date", ["date", "31-02-1990", 1]),
+        ("id", ["id", "1", 1]),
+        ("id", ["id", 1, True]),
+    ]
+    for sort, data in tampered:
+        params = {"sort": sort, "cursor": cursor(*data)}
+        response = client.get("/users/", params=params, headers=headers)
+        assert response.status_code == 400, data
+    for sort, data in (("date", ["date", "15-03-1990", 1]), ("name", ["name", None, 1])):
+        params = {"sort": sort, "cursor": cursor(*data)}
+        assert client.get("/users/", params=params, headers=headers).status_code == 200
+
+
+def test_export_users(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    response = client.get(
+        "/users/export", params={"fields": "id,email"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows and set(rows[0]) == {"id", "email"}
+
+    response = client.get(
+        "/users/export",
+        params={"format": "csv", "fields": "id,name", "is_active": True},
+        headers=headers,
+    )
+    lines = response.text.splitlines()
+    assert lines[0] == "id,name"
+    assert len(lines) == len(rows) + 1
+
+    response = client.get(
+        "/users/export", params={"fields": "hashed_password"}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_create_users(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    records = [
+        {"name": "Bulk 0", "email": "bulk0@example.com", "password": "p", "cp": "01000"},
+        {"name": "Bulk 1", "email": "bulk1@example.com", "password": "p"},
+        {"name": "Bulk 2", "email": "bulk0@example.com", "password": "p"},
+        {"name": "Bulk 3", "email": "bulk3@example.com", "password": "p", "cp": "1"},
+        {"name": "Bulk 4", "email": "page0@example.com", "password": "p"},
+        {"email": "bulk5@example.com", "password": "p"},
+    ]
+    response = client.post("/users/bulk", json=records, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert [r["status"] for r in body["results"]] == [
+        "created", "created", "error", "error", "error", "error",
+    ]
+    assert body["results"][4]["errors"][0]["field"] == "email"
+
+    ndjson = "\n".join(
+        json.dumps({"name": f"Nd {i}", "email": f"nd{i}@example.com", "password": "p"})
+        for i in range(3)
+    )
+    response = client.post(
+        "/users/bulk",
+        content=ndjson,
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 3
+
+
+def test_conditional_requests(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    response = client.post(
+        "/users/",
+        json={"name": "Etag", "email": "etag@example.com", "password": "p"},
+        headers=headers,
+    )
+    user_id = response.json()["id"]
+
+    response = client.get(f"/users/{user_id}", headers=headers)
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert etag == f'"{user_id}.1"'
+
+    for conditional in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+        response = client.get(f"/users/{user_id}", headers={**headers, **conditional})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    update = {"name": "Etag 2", "email": "etag@example.com"}
+    response = client.put(
+        f"/users/{user_id}", json=update, headers={**headers, "If-Match": '"%d.7"' % user_id}
+    )
+    assert response.status_code == 412
+
+    response = client.put(
+        f"/users/{user_id}", json=update, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{user_id}.2"'
+
+    response = client.get(f"/users/{user_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Etag 2"
+
+    page = {"limit": 100}
+    response = client.get("/users/", params=page, headers=headers)
+    page_etag = response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+    response = client.get(
+        "/users/", params=page, headers={**headers, "If-None-Match": page_etag}
+    )
+    assert response.status_code == 304
+
+    # Un borrado no cambia el updated_at de las filas restantes, pero sí la ETag
+    assert client.delete(f"/users/{user_id}", headers=headers).status_code == 200
+    response = client.get(
+        "/users/", params=page, headers={**headers, "If-None-Match": page_etag}
+    )
+    assert response.status_code == 200
+    assert user_id not in [item["id"] for item in response.json()]
+    response = client.get(
+        "/users/", params=page, headers={**headers, "If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+
+
+def test_filter_users(admin_token):
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    records = [
+        {"name": "Filtro Ana", "email": "ana@filtro.mx", "password": "p",
+         "cp": "44100", "date": "15-03-1990", "address": "Calle Reforma 10"},
+        {"name": "Filtro Beto", "email": "beto@filtro.mx", "password": "p",
+         "cp": "44100", "date": "28-02-1985", "address": "Avenida Juárez 5"},
+        {"name": "Filtro Carla", "email": "carla@filtro.mx", "password": "p",
+         "cp": "06000", "date": "01-12-1990", "address": "Calle Reforma 22"},
+    ]
+    response = client.post("/users/bulk", json=records, headers=headers)
+    assert response.json()["created"] == 3
+
+    def names(**params):
+        response = client.get("/users/", params=params, headers=headers)
+        assert response.status_code == 200
+        return [user["name"] for user in response.json()]
+
+    assert names(cp="44100") == ["Filtro Ana", "Filtro Beto"]
+    assert names(name="Filtro C") == ["Filtro Carla"]
+    assert names(email="beto@") == ["Filtro Beto"]
+    assert names(date_from="01-01-1990", date_to="31-12-1990") == [
+        "Filtro Ana", "Filtro Carla",
+    ]
+    assert names(q="reforma") == ["Filtro Ana", "Filtro Carla"]
+    assert names(q="juarez") == ["Filtro Beto"]
+    assert names(q="refor", cp="06000") == ["Filtro Carla"]
+
+    # La fecha se guarda como DATE: ordena cronológicamente y conserva el formato
+    response = client.get("/users/", params={"cp": "44100", "sort": "date"}, headers=headers)
+    assert [user["date"] for user in response.json()] == ["28-02-1985", "15-03-1990"]
+    assert names(email="carla@", age_min=30) == ["Filtro Carla"]
+    assert names(email="carla@", age_max=20) == []
+
+    # Los filtros se combinan con la paginación por cursor
+    response = client.get("/users/", params={"cp": "44100", "limit": 1}, headers=headers)
+    cursor = response.headers["X-Next-Cursor"]
+    assert names(cp="44100", limit=1, cursor=cursor) == ["Filtro Beto"]
+
+    response = client.get("/users/", params={"date_from": "31-02-1990"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"][0]["field"] == "date_from"
+    response = client.get("/users/", params={"age_max": 2025}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"][0]["field"] == "age_max"
+    # El 29 de febrero del año 0 no existe: error de validación, no un 500
+    response = client.get("/users/", params={"date_from": "29-02-0000"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"][0]["field"] == "date_from"
+    response = client.post(
+        "/users/",
+        json={"name": "Año Cero", "email": "cero@example.com", "password": "x",
+              "date": "29-02-0000"},
+        headers=headers,
+    )
+    assert 400 <= response.status_code < 500
+
+
+def test_write_round_trips(admin_token):
+    from sqlalchemy import event
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if '"user"' in statement or "user " in statement:
+            statements.append(statement.split()[0])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post(
+            "/users/",
+            json={"name": "Rt", "email": "rt@example.com", "password": "p",
+                  "rfc": "RTRT900101AAA"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        user_id = response.json()["id"]
+        response = client.put(
+            f"/users/{user_id}",
+            json={"name": "Rt 2", "email": "rt@example.com"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert response.json()["name"] == "Rt 2"
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    # Una sola sentencia por escritura: INSERT/UPDATE ... RETURNING
+    assert statements == ["INSERT", "UPDATE"]
+
+    # Los duplicados los detectan las restricciones únicas, con los mensajes de siempre
+    duplicates = [
+        ({"email": "rt@example.com"}, "el correo electrónico usado ya existe"),
+        ({"email": "rt2@example.com", "rfc": "RTRT900101AAA"}, "el RFC usado ya existe"),
+    ]
+    for fields, message in duplicates:
+        response = client.post(
+            "/users/", json={"name": "Dup", "password": "p", **fields}, headers=headers
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == message
+
+    response = client.put(
+        f"/users/{user_id}",
+        json={"name": "Rt", "email": "page0@example.com"},
+        headers=headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "el correo electrónico usado ya existe"
+
+
+def test_field_projection(admin_token):
+    from sqlalchemy import event
+    from cache import user_cache
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+    response = client.post(
+        "/users/",
+        json={"name": "Proj", "email": "proj@example.com", "password": "p",
+              "address": "Calle larga 123"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    user_id = response.json()["id"]
+    full = client.get(f"/users/{user_id}", headers=headers)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM user" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            "/users/", params={"fields": "id,email", "limit": 100}, headers=headers
+        )
+        assert response.status_code == 200
+        assert all(set(item) == {"id", "email"} for item in response.json())
+
+        # Sin el usuario en caché solo se leen las columnas pedidas
+        user_cache.clear()
+        response = client.get(f"/users/{user_id}?fields=email", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"email": "proj@example.com"}
+        # Otra representación: su ETag no es la del usuario completo
+        projected_etag = response.headers["etag"]
+        assert projected_etag != full.headers["etag"]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements
+    assert not any("address" in statement for statement in statements)
+
+    # Con el usuario completo en caché la proyección sale de la caché
+    client.get(f"/users/{user_id}", headers=headers)
+    response = client.get(f"/users/{user_id}?fields=name,date", headers=headers)
+    assert response.json() == {"name": "Proj", "date": None}
+    assert response.headers["etag"] not in (projected_etag, full.headers["etag"])
+
+    # La misma ETag con o sin el usuario en caché; la del usuario completo no sirve
+    response = client.get(
+        f"/users/{user_id}?fields=email",
+        headers={**headers, "If-None-Match": projected_etag},
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == projected_etag
+    response = client.get(
+        f"/users/{user_id}?fields=email",
+        headers={**headers, "If-None-Match": full.headers["etag"]},
+    )
+    assert response.status_code == 200
+    # Ni como If-Match de un PUT
+    response = client.put(
+        f"/users/{user_id}",
+        json={"name": "Proj", "email": "proj@example.com"},
+        headers={**headers, "If-Match": projected_etag},
+    )
+    assert response.status_code == 412
+
+    for url in ("/users/?fields=email,hashed_password", f"/users/{user_id}?fields=nope"):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 400
+
+
+def test_user_stats(admin_token):
+    from sqlalchemy import text
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    def counted() -> dict:
+        with engine.connect() as conn:
+            total = conn.scalar(text('SELECT count(*) FROM "user"'))
+            active = conn.scalar(text('SELECT count(*) FROM "user" WHERE is_active'))
+            prefixes = dict(
+                conn.execute(
+                    text(
+                        'SELECT substr(cp, 1, 2), count(*) FROM "user" '
+                        "WHERE cp <> '' GROUP BY 1"
+                    )
+                ).all()
+            )
+        return {"total": total, "active": active, "inactive": total - active,
+                "cp_prefixes": prefixes}
+
+    # Los triggers mantienen los contadores en cada escritura, incluida la carga masiva
+    before = client.get("/users/stats", headers=headers).json()
+    assert before == counted()
+    response = client.post(
+        "/users/",
+        json={"name": "St", "email": "st@example.com", "password": "p", "cp": "44100"},
+        headers=headers,
+    )
+    user_id = response.json()["id"]
+    client.put(
+        f"/users/{user_id}",
+        json={"name": "St", "email": "st@example.com", "cp": "45000", "is_active": False},
+        headers=headers,
+    )
+    client.post(
+        "/users/bulk",
+        json=[{"name": "Sb", "email": "sb@example.com", "password": "p", "cp": "45010"}],
+        headers=headers,
+    )
+    stats = client.get("/users/stats", headers=headers).json()
+    assert stats == counted()
+    assert stats["total"] == before["total"] + 2
+    assert stats["cp_prefixes"]["45"] == before["cp_prefixes"].get("45", 0) + 2
+
+    client.delete(f"/users/{user_id}", headers=headers)
+    assert client.get("/users/stats", headers=headers).json() == counted()
+
+    # La reconciliación corrige la deriva y la reporta
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE user_stats SET count = count + 5 WHERE name = 'total'"))
+    response = client.post("/users/stats/reconcile", headers=headers)
+    assert response.status_code == 200
+    total = counted()["total"]
+    assert response.json()["corrected"] == {"total": {"stored": total + 5, "actual": total}}
+    assert client.get("/users/stats", headers=headers).json() == counted()
+
+
+def test_bulk_update_and_delete(admin_token, monkeypatch):
+    from sqlalchemy import event
+    from routes import user as user_routes
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+    records = [
+        {"name": f"Lote {i}", "email": f"lote{i}@example.com", "password": "p",
+         "cp": "77000" if i % 2 else "77100"}
+        for i in range(5)
+    ]
+    created = client.post("/users/bulk", json=records, headers=headers).json()
+    ids = [result["id"] for result in created["results"]]
+    before = client.get(f"/users/{ids[0]}", headers=headers)
+    assert before.json()["is_active"] is True
+
+    # Bloques de 2 ids: una sentencia UPDATE por bloque, en su propia transacción
+    monkeypatch.setattr(user_routes, "BULK_CHUNK_SIZE", 2)
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE user"):
+            updates.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.patch(
+            "/users/bulk",
+            json={"filters": {"cp_in": ["77000", "77100"]},
+                  "values": {"is_active": False, "address": "Dada de baja"}},
+            headers=headers,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert response.json() == {"affected": 5}
+    assert len(updates) == 3
+
+    # La versión sube (nueva ETag) y la caché de GET /users/{id} se invalida
+    after = client.get(f"/users/{ids[0]}", headers=headers)
+    assert after.json()["is_active"] is False
+    assert after.json()["address"] == "Dada de baja"
+    assert after.headers["etag"] != before.headers["etag"]
+
+    # Ids y filtros se combinan: solo los de CP 77000 dentro de la lista
+    response = client.patch(
+        "/users/bulk",
+        json={"ids": ids[:3], "filters": {"cp": "77000"}, "values": {"is_active": True}},
+        headers=headers,
+    )
+    assert response.json() == {"affected": 1}
+
+    invalid = [
+        {"ids": ids, "values": {"cp": "123"}},
+        {"ids": ids, "values": {}},
+        {"filters": {}, "values": {"is_active": True}},
+        {"filters": {"date_from": "31-02-2000"}, "values": {"is_active": True}},
+    ]
+    for body in invalid:
+        response = client.patch("/users/bulk", json=body, headers=headers)
+        assert response.status_code == 400, body
+    # null o vacío explícito: rechazado en lugar de borrar el campo en toda la selección
+    for values in ({"is_active": None}, {"phone": "", "date": "", "cp": ""}, {"address": ""}):
+        response = client.patch(
+            "/users/bulk", json={"ids": ids, "values": values}, headers=headers
+        )
+        assert response.status_code == 422, values
+    assert client.get(f"/users/{ids[0]}", headers=headers).json()["address"] == "Dada de baja"
+    assert client.get(f"/users/{ids[2]}", headers=headers).json()["is_active"] is False
+
+    response = client.request(
+        "DELETE", "/users/bulk", json={"ids": ids[:2] + [999999]}, headers=headers
+    )
+    assert response.json() == {"affected": 2}
+    assert client.get(f"/users/{ids[0]}", headers=headers).status_code == 404
+    response = client.request(
+        "DELETE", "/users/bulk", json={"filters": {"cp_in": ["77000", "77100"]}},
+        headers=headers,
+    )
+    assert response.json() == {"affected": 3}
+    assert client.request("DELETE", "/users/bulk", json={}, headers=headers).status_code == 400
+    stats = client.get("/users/stats", headers=headers).json()
+    assert "77" not in stats["cp_prefixes"]
+
+
+def test_user_changes(admin_token):
+    import time
+    from sqlalchemy import text
+    from crud.user import compact_user_changes
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+
+    # Sin since solo se obtiene el seq actual, desde donde seguir los cambios
+    head = client.get("/users/changes", headers=headers).json()
+    assert head["changes"] == []
+    since = head["next"]
+
+    response = client.post(
+        "/users/",
+        json={"name": "Ch", "email": "ch@example.com", "password": "p"},
+        headers=headers,
+    )
+    user_id = response.json()["id"]
+    client.put(
+        f"/users/{user_id}",
+        json={"name": "Ch 2", "email": "ch@example.com"},
+        headers=headers,
+    )
+    # Cada cambio trae al usuario solo si sigue en esa versión
+    response = client.get(f"/users/changes?since={since}&fields=id,name", headers=headers)
+    assert [c["user"] for c in response.json()["changes"]] == [
+        None, {"id": user_id, "name": "Ch 2"},
+    ]
+    created = client.post(
+        "/users/bulk",
+        json=[{"name": "Cb", "email": "cb@example.com", "password": "p"}],
+        headers=headers,
+    ).json()
+    bulk_id = created["results"][0]["id"]
+    client.patch(
+        "/users/bulk", json={"ids": [bulk_id], "values": {"is_active": False}},
+        headers=headers,
+    )
+    client.delete(f"/users/{user_id}", headers=headers)
+    client.request("DELETE", "/users/bulk", json={"ids": [bulk_id]}, headers=headers)
+
+    response = client.get(f"/users/changes?since={since}&fields=id,name", headers=headers)
+    assert response.status_code == 200
+    page = response.json()
+    changes = page["changes"]
+    assert [(c["op"], c["user_id"]) for c in changes] == [
+        ("create", user_id), ("update", user_id), ("create", bulk_id),
+        ("update", bulk_id), ("delete", user_id), ("delete", bulk_id),
+    ]
+    seqs = [c["seq"] for c in changes]
+    assert seqs == sorted(seqs) and page["next"] == seqs[-1]
+    assert [c["version"] for c in changes[:2]] == [1, 2]
+    # Los usuarios ya eliminados no se devuelven
+    assert all(c["user"] is None for c in changes)
+
+    # Paginación por seq
+    first = client.get(f"/users/changes?since={since}&limit=2", headers=headers).json()
+    assert [c["seq"] for c in first["changes"]] == seqs[:2]
+    rest = client.get(f"/users/changes?since={first['next']}", headers=headers).json()
+    assert [c["seq"] for c in rest["changes"]] == seqs[2:]
+
+    # Long-poll sin cambios: espera y devuelve la página vacía con el mismo next
+    started = time.monotonic()
+    response = client.get(f"/users/changes?since={page['next']}&wait=0.2", headers=headers)
+    assert time.monotonic() - started >= 0.2
+    assert response.json() == {"changes": [], "next": page["next"]}
+
+    # Server-Sent Events: un evento por cambio con id = seq
+    response = client.get(
+        f"/users/changes?since={seqs[3]}&wait=0",
+        headers={**headers, "Accept": "text/event-stream"},
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [e for e in response.text.split("\n\n") if e.startswith("id:")]
+    assert [e.splitlines()[:2] for e in events] == [
+        [f"id: {seqs[4]}", "event: delete"], [f"id: {seqs[5]}", "event: delete"],
+    ]
+    response = client.get(
+        "/users/changes?since=0&wait=0",
+        headers={**headers, "Accept": "text/event-stream", "Last-Event-ID": str(seqs[4])},
+    )
+    assert response.text.count("id:") == 1
+
+    # Tras compactar, un since anterior a lo conservado pide resincronizar; siempre
+    # queda el último cambio para que el seq actual siga siendo válido
+    with engine.connect() as conn:
+        logged = conn.scalar(text("SELECT count(*) FROM user_changes"))
+    with TestingSessionLocal() as db:
+        assert compact_user_changes(db, time.time() + 1, batch_size=2) == logged - 1
+    assert client.get(f"/users/changes?since={since}", headers=headers).status_code == 410
+    latest = client.get(f"/users/changes?since={seqs[-1]}", headers=headers)
+    assert latest.json() == {"changes": [], "next": seqs[-1]}
+
+    # El id del último usuario eliminado no se reutiliza
+    response = client.post(
+        "/users/",
+        json={"name": "Cn", "email": "cn@example.com", "password": "p"},
+        headers=headers,
+    )
+    assert response.json()["id"] > bulk_id
+    client.delete(f"/users/{response.json()['id']}", headers=headers)
+
+
+def test_bulk_write_partial_failure(admin_token, monkeypatch):
+    from sqlalchemy import event
+    from routes import user as user_routes
+
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+    }
+    records = [
+        {"name": f"Parcial {i}", "email": f"parcial{i}@example.com", "password": "p"}
+        for i in range(4)
+    ]
+    created = client.post("/users/bulk", json=records, headers=headers).json()
+    ids = [result["id"] for result in created["results"]]
+    # En caché antes de la escritura
+    assert client.get(f"/users/{ids[0]}", headers=headers).json()["address"] is None
+
+    # El segundo bloque falla después de confirmar el primero
+    monkeypatch.setattr(user_routes, "BULK_CHUNK_SIZE", 2)
+    updates = []
+
+    def fail_second(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE user"):
+            updates.append(statement)
+            if len(updates) == 2:
+                raise RuntimeError("falla simulada")
+
+    event.listen(engine, "before_cursor_execute", fail_second)
+    try:
+        response = client.patch(
+            "/users/bulk",
+            json={"ids": ids, "values": {"address": "Parcial"}},
+            headers=headers,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", fail_second)
+    assert response.status_code == 500
+    assert response.json()["detail"]["affected"] == 2
+
+    # Lo confirmado se ve sin esperar al TTL de la caché; el resto quedó igual
+    addresses = [
+        client.get(f"/users/{user_id}", headers=headers).json()["address"]
+        for user_id in ids
+    ]
+    assert addresses == ["Parcial", "Parcial", None, None]
@@ -0,0 +1,52 @@
+from validation import (
+    check_curp,
+    check_rfc,
+    check_date,
+    curp_check_digit,
+    validate_record,
+    validate_batch,
+    CURP_CHECK_DIGIT_MESSAGE,
+    CURP_DATE_MESSAGE,
+    RFC_DATE_MESSAGE,
+    DATE_CALENDAR_MESSAGE,
+    DATE_MESSAGE,
+    CP_MESSAGE,
+    PHONE_MESSAGE,
+)
+
+
+def test_curp():
+    assert check_curp("ABCD900101HDFRRN02") is None
+    assert check_curp("ABCD900101HDFRRN03") == CURP_CHECK_DIGIT_MESSAGE
+    assert check_curp("ABCD901301HDFRRN02") == CURP_DATE_MESSAGE
+    # Nacidos en 2000 o después usan una letra como diferenciador
+    curp = "ABCD000229MDFRRNA"
+    assert check_curp(curp + str(curp_check_digit(curp))) is None
+
+
+def test_rfc_and_date():
+    assert check_rfc("ABCD900101XYZ") is None
+    assert check_rfc("ABC900230XY1") == RFC_DATE_MESSAGE
+    assert check_date("29-02-2024") is None
+    assert check_date("29-02-2023") == DATE_CALENDAR_MESSAGE
+    assert check_date("29-02-0000") == DATE_CALENDAR_MESSAGE
+    assert check_date("01-01-0000") == DATE_CALENDAR_MESSAGE
+    assert check_date("2024-02-29") == DATE_MESSAGE
+
+
+def test_validate_record_collects_every_error():
+    errors = validate_record(
+        {"cp": "123", "phone": "55", "date": "31-04-2024", "rfc": None}
+    )
+    assert errors == [
+        {"field": "cp", "msg": CP_MESSAGE},
+        {"field": "phone", "msg": PHONE_MESSAGE},
+        {"field": "date", "msg": DATE_CALENDAR_MESSAGE},
+    ]
+
+
+def test_validate_batch():
+    records = [{"cp": "12345"}, {"cp": "1"}, {"phone": "x", "cp": "2"}]
+    errors = validate_batch(records)
+    assert set(errors) == {1, 2}
+    assert [e["field"] for e in errors[2]] == ["cp", "phone"]